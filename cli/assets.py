@@ -89,6 +89,32 @@ def shuffle_assets(
 
     print(f"[green]🔀 assets.txt at {assets_file} has been randomized.[/green]")
 
+@app.command("prepare")
+def prepare_assets(
+    name: str = typer.Argument(..., help="Name of the experiment"),
+    workers: int = typer.Option(None, "--workers", "-w", help="Worker processes (default: all cores)")
+):
+    """
+    Fit OBJECTS/ stimuli once to the display resolution from display-conf.yml.
+    Results are raw RGBA .npy arrays in __cache__/stimuli, keyed by source hash and display profile.
+    """
+    from experiments import stimprep
+
+    project = resolve_experiment(name)
+    if not (project / "config" / "display-conf.yml").exists():
+        print(f"[red]❌ display-conf.yml not found in {project / 'config'}[/red]")
+        raise typer.Exit()
+
+    manifest, converted = stimprep.prepare(project, workers=workers)
+    total = len(manifest["entries"])
+    if not total:
+        print(f"[yellow]⚠ No valid image files found in {project / 'OBJECTS'}[/yellow]")
+        raise typer.Exit()
+
+    width, height = manifest["profile"]["resolution"]
+    print(f"[green]✅ {total} stimuli ready for {width}x{height} "
+          f"({converted} converted, {total - converted} already cached) in {project / stimprep.CACHE_DIR}[/green]")
+
 @app.command("import")
 def import_assets(
     source: Path = typer.Option(..., "--from", "-f", help="Folder with images to import"),
@@ -23,6 +23,7 @@ import typer
 import pylsl
 import requests
 from pathlib import Path
+from typing import List
 
 app = typer.Typer(help="Manage and test connected devices (LSL, Pupil Labs, Emobit, MilliKey)")
 
@@ -49,12 +50,74 @@ def list_streams(
         typer.echo(f"Error while resolving LSL streams: {e}")
         raise typer.Exit(code=1)
 
+# -------------------------------------------------------------------
+# Subcommand: xtim devices record
+# -------------------------------------------------------------------
+@app.command("record")
+def record_streams(
+    stream: List[str] = typer.Option(None, "--stream", "-s", help="Stream name to record (repeatable)"),
+    stream_type: List[str] = typer.Option(None, "--type", "-t", help="Stream type to record, e.g. EEG (repeatable)"),
+    out: Path = typer.Option(None, "--out", "-o", help="XDF file to write (default: recording_<date>.xdf)"),
+    duration: float = typer.Option(0.0, "--duration", "-d", help="Seconds to record (0 = until CTRL+C)"),
+    timeout: float = typer.Option(2.0, help="Timeout in seconds for LSL stream resolution"),
+    interval: float = typer.Option(5.0, help="Seconds between progress reports"),
+):
+    """
+    Record LSL streams (all, or the selected ones) into an XDF file.
+    """
+    import time
+    from experiments import recorder
+
+    streams = recorder.select_streams(pylsl.resolve_streams(wait_time=timeout), stream or (), stream_type or ())
+    if not streams:
+        typer.echo("No matching LSL streams found.")
+        raise typer.Exit(code=1)
+    out = out or Path(f"recording_{time.strftime('%Y%m%d_%H%M%S')}.xdf")
+
+    recording = recorder.Recording(streams, out)
+    for info in streams:
+        typer.echo(f"Recording {info.name()} ({info.type()}, {info.channel_count()} ch @ {info.nominal_srate():g} Hz)")
+    typer.echo(f"Writing {out}. Press CTRL+C to stop.")
+    recording.start()
+    try:
+        end = time.monotonic() + duration if duration > 0 else float("inf")
+        next_report = time.monotonic() + interval
+        while time.monotonic() < end:
+            time.sleep(min(0.2, max(0.0, end - time.monotonic())))
+            if time.monotonic() >= next_report:
+                typer.echo(", ".join(f"{s['name']}: {s['samples']} ({s['rate']:.0f}/s)" for s in recording.status()))
+                next_report += interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recording.stop()
+
+    for s in recording.status():
+        problem = f" - {s['error']}" if s["error"] else ""
+        typer.echo(f"  {s['name']:<24} {s['samples']:>10} samples{problem}")
+    typer.echo(f"Saved {out} ({out.stat().st_size / 1e6:.1f} MB).")
+
 # -------------------------------------------------------------------
 # Subcommand: xtim devices pupil start/stop/export
 # -------------------------------------------------------------------
 pupil_app = typer.Typer(help="Control Pupil Labs recording via API")
 app.add_typer(pupil_app, name="pupil")
 
+def _capture_get(url, timeout=5.0):
+    """
+    GET a Pupil Capture URL through the device broker's kept-alive session when
+    a broker is running, otherwise directly. Returns the HTTP status code.
+    """
+    from experiments import broker
+
+    if broker.available():
+        client = broker.BrokerClient(timeout=timeout + 1.0)
+        try:
+            return client.request("http", url=url)["status"]
+        finally:
+            client.close()
+    return requests.get(url, timeout=timeout).status_code
+
 @pupil_app.command("start")
 def start_recording(ip: str = "127.0.0.1", port: int = 50020):
     """
@@ -62,7 +125,7 @@ def start_recording(ip: str = "127.0.0.1", port: int = 50020):
     """
     url = f"http://{ip}:{port}"
     try:
-        requests.get(f"{url}/recording/start")
+        _capture_get(f"{url}/recording/start")
         typer.echo("Pupil Capture recording started.")
     except Exception as e:
         typer.echo(f"Failed to start recording: {e}")
@@ -75,7 +138,7 @@ def stop_recording(ip: str = "127.0.0.1", port: int = 50020):
     """
     url = f"http://{ip}:{port}"
     try:
-        requests.get(f"{url}/recording/stop")
+        _capture_get(f"{url}/recording/stop")
         typer.echo("Pupil Capture recording stopped.")
     except Exception as e:
         typer.echo(f"Failed to stop recording: {e}")
@@ -88,7 +151,7 @@ def export_recording(ip: str = "127.0.0.1", port: int = 50020, export_path: Path
     """
     url = f"http://{ip}:{port}"
     try:
-        requests.get(f"{url}/export/manual")
+        _capture_get(f"{url}/export/manual")
         typer.echo("Pupil Capture export initiated.")
 
         if export_path:
@@ -98,3 +161,179 @@ def export_recording(ip: str = "127.0.0.1", port: int = 50020, export_path: Path
     except Exception as e:
         typer.echo(f"Failed to trigger export: {e}")
         raise typer.Exit(code=1)
+
+# -------------------------------------------------------------------
+# Subcommand: xtim devices simulate
+# -------------------------------------------------------------------
+@app.command("simulate")
+def simulate(
+    pupil: bool = typer.Option(True, "--pupil/--no-pupil", help="Start the Pupil Remote emulator"),
+    neo: bool = typer.Option(True, "--neo/--no-neo", help="Start the NEO realtime-API stand-in"),
+    pupil_port: int = typer.Option(50020, help="Pupil Remote (ZMQ REP) port"),
+    http_port: int = typer.Option(50021, help="Pupil Capture HTTP port (recording/export endpoints)"),
+    neo_port: int = typer.Option(8080, help="NEO HTTP API port"),
+    echo_port: int = typer.Option(12321, help="NEO time-echo TCP port"),
+    latency: float = typer.Option(0.0, help="Injected reply latency in ms"),
+    jitter: float = typer.Option(0.0, help="Latency jitter (SD) in ms"),
+    clock_offset: float = typer.Option(0.0, help="NEO clock offset from this machine in ms"),
+    interval: float = typer.Option(5.0, help="Seconds between throughput reports"),
+):
+    """
+    Run local Pupil Remote / NEO stand-ins with injected latency until CTRL+C.
+    """
+    import time
+    from cli.simulators import Latency, NeoEmulator, PupilRemoteEmulator
+
+    servers = []
+    try:
+        if pupil:
+            servers.append(PupilRemoteEmulator(port=pupil_port, http_port=http_port,
+                                               latency=Latency(latency, jitter)).start())
+            typer.echo(f"Pupil Remote emulator: tcp://127.0.0.1:{pupil_port} "
+                       f"(PUB {servers[-1].pub_port}, HTTP {http_port})")
+        if neo:
+            servers.append(NeoEmulator(port=neo_port, time_echo_port=echo_port, clock_offset_ms=clock_offset,
+                                       latency=Latency(latency, jitter)).start())
+            typer.echo(f"NEO stand-in: http://127.0.0.1:{neo_port} (time echo {echo_port}) "
+                       f"- run protocols with --neo-address 127.0.0.1:{neo_port}")
+    except Exception as e:
+        for server in servers:
+            server.stop()
+        typer.echo(f"Failed to start simulators: {e}")
+        raise typer.Exit(code=1)
+
+    typer.echo(f"Injected latency: {latency:.1f} ± {jitter:.1f} ms. Press CTRL+C to stop.")
+    counters = lambda s: (s.requests + s.annotations) if isinstance(s, PupilRemoteEmulator) else (s.http.hits + s.echoes)
+    last = [counters(s) for s in servers]
+    try:
+        while True:
+            time.sleep(interval)
+            now = [counters(s) for s in servers]
+            rates = ", ".join(f"{type(s).__name__}: {(n - l) / interval:.0f} msg/s"
+                              for s, n, l in zip(servers, now, last))
+            typer.echo(rates)
+            last = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.stop()
+        typer.echo("Simulators stopped.")
+
+# -------------------------------------------------------------------
+# Subcommand: xtim devices cache list/clear
+# -------------------------------------------------------------------
+cache_app = typer.Typer(help="Inspect or clear cached device addresses (~/.xtim/devices.json)")
+app.add_typer(cache_app, name="cache")
+
+@cache_app.command("list")
+def cache_list(
+    probe: bool = typer.Option(False, "--probe", help="Check whether each cached device answers now"),
+):
+    """
+    Show the cached device addresses used before network discovery.
+    """
+    import time
+    from experiments import devicecache
+
+    cache = devicecache.load()
+    if not cache:
+        typer.echo("No cached devices.")
+        return
+    for kind, entry in cache.items():
+        seen = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.get("seen", 0)))
+        line = f"{kind}: {entry['address']}:{entry['port']}  serial {entry.get('serial') or '-'}  last seen {seen}"
+        if probe and kind == "neo":
+            reachable = devicecache.probe_neo(entry["address"], entry["port"]) is not None
+            line += "  (reachable)" if reachable else "  (not reachable)"
+        typer.echo(line)
+
+@cache_app.command("clear")
+def cache_clear(
+    kind: str = typer.Argument(None, help="Device kind to forget (e.g. neo); all when omitted"),
+):
+    """
+    Forget cached device addresses so the next session runs full discovery.
+    """
+    from experiments import devicecache
+
+    removed = devicecache.forget(kind)
+    typer.echo(f"Removed {removed} cached device(s).")
+
+# -------------------------------------------------------------------
+# Subcommand: xtim devices broker start/status/stop
+# -------------------------------------------------------------------
+broker_app = typer.Typer(help="Long-lived device broker holding warm Pupil, NEO and LSL connections")
+app.add_typer(broker_app, name="broker")
+
+@broker_app.command("start")
+def broker_start(
+    pupil: str = typer.Option(None, "--pupil", help="Connect Pupil Remote at ip[:port] on startup"),
+    neo: bool = typer.Option(False, "--neo", help="Connect the NEO on startup (cached address, then discovery)"),
+    neo_address: str = typer.Option(None, "--neo-address", help="NEO host[:port] instead of discovery"),
+    background: bool = typer.Option(False, "--background", "-b", help="Detach into its own process"),
+):
+    """
+    Start the device broker (foreground unless --background).
+    """
+    import subprocess
+    import sys
+    from experiments import broker
+
+    if broker.available():
+        typer.echo(f"A broker is already running on {broker.DEFAULT_ENDPOINT}.")
+        raise typer.Exit()
+
+    neo_target = neo_address or (True if neo else None)
+    if not background:
+        ip, _, port = (pupil or "").partition(":")
+        broker.DeviceBroker(pupil=(ip, int(port or 50020)) if pupil else None, neo=neo_target).serve()
+        return
+
+    command = [sys.executable, "-m", "experiments.broker"]
+    if pupil:
+        command += ["--pupil", pupil]
+    if neo_address:
+        command += ["--neo", neo_address]
+    elif neo:
+        command.append("--neo")
+    detach = {"creationflags": subprocess.CREATE_NEW_CONSOLE} if sys.platform == "win32" else {"start_new_session": True}
+    process = subprocess.Popen(command, cwd=Path(__file__).parent.parent, **detach)
+    typer.echo(f"Broker starting in background (pid {process.pid}). Check with 'xtim devices broker status'.")
+
+@broker_app.command("status")
+def broker_status():
+    """
+    Show the broker's connections and relayed marker counts.
+    """
+    from experiments import broker
+
+    if not broker.available():
+        typer.echo("No broker running.")
+        raise typer.Exit(code=1)
+    client = broker.BrokerClient()
+    try:
+        status = client.request("status")
+    finally:
+        client.close()
+    typer.echo(f"Broker pid {status['pid']}, up {status['uptime']:.0f} s")
+    typer.echo(f"  Pupil: {status['pupil'] or '-'}  NEO: {status['neo'] or '-'}")
+    typer.echo(f"  LSL outlets: {', '.join(status['outlets']) or '-'}")
+    typer.echo("  Relayed: " + ", ".join(f"{k} {v}" for k, v in status["counts"].items()))
+
+@broker_app.command("stop")
+def broker_stop():
+    """
+    Stop the broker after delivering queued markers.
+    """
+    from experiments import broker
+
+    if not broker.available():
+        typer.echo("No broker running.")
+        raise typer.Exit(code=1)
+    client = broker.BrokerClient()
+    try:
+        client.request("stop")
+    finally:
+        client.close()
+    typer.echo("Broker stopping.")
@@ -1,11 +1,11 @@
-
 # cli/main.py
 
+import importlib
 import typer
+from typer.core import TyperCommand, TyperGroup
 
-app = typer.Typer(
-    help="XTIM: CLI for Experimental Neuroscience Workflows",
-    epilog="""
+HELP = "XTIM: CLI for Experimental Neuroscience Workflows"
+EPILOG = """
 Developed as part of the XSCAPE Project (INCIPIT/CSIC).
 Designed to manage, execute and document multimodal cognitive science experiments
 involving eye-tracking, physiological sensors, and real-time data streams.
@@ -16,41 +16,67 @@ Author Contact:
 
 Arturo-Jose Valiño (Lead) : arturo-jose.valino@incipit.csic.es
     """
+
+# Subcommand groups: name -> (module, help). Modules are imported only when
+# their command is invoked; top-level help and completion use the help text here.
+SUBCOMMANDS = {
+    "new": ("cli.new", "Create new experiments from standardized templates (Cookiecutter)"),
+    "run": ("cli.run", "Execute experimental sessions with real-time synchronization"),
+    "devices": ("cli.devices", "Configure and list available hardware interfaces"),
+    "export": ("cli.export", "Export experiments as compressed archives"),
+    "config": ("cli.config", "Edit or inspect system-wide experimental configuration"),
+    "menu": ("cli.menu", "Launch the interactive XTIM terminal menu"),
+    "info": ("cli.info", "View and summarize experiment metadata and settings"),
+    "doctor": ("cli.doctor", "Run diagnostic checks for XTIM environment"),
+    "validate": ("cli.validate", "Validate experiment structure and metadata"),
+    "delete": ("cli.delete", "Delete experiments from LABORATORY"),
+    "archive": ("cli.archive", "Archive experiments into the ARCHIVE folder"),
+    "test": ("cli.test", "Run integrated system tests"),
+    "assets": ("cli.assets", "Manage and generate assets.txt files for experiments"),
+}
+
+
+class LazyGroup(TyperGroup):
+    """
+    Click group that lists SUBCOMMANDS from their stored help text and imports
+    a subcommand module only when that command is resolved for execution.
+    """
+
+    def list_commands(self, ctx):
+        return [*super().list_commands(ctx), *(name for name in SUBCOMMANDS if name not in self.commands)]
+
+    def get_command(self, ctx, name):
+        if name in self.commands or name not in SUBCOMMANDS:
+            return super().get_command(ctx, name)
+        # Placeholder for help listings and completion of the command name
+        help_text = SUBCOMMANDS[name][1]
+        return TyperCommand(name, help=help_text, short_help=help_text)
+
+    def resolve_command(self, ctx, args):
+        if args and args[0] in SUBCOMMANDS and args[0] not in self.commands:
+            self.load(args[0])
+        return super().resolve_command(ctx, args)
+
+    def load(self, name):
+        module_name, help_text = SUBCOMMANDS[name]
+        command = typer.main.get_command(importlib.import_module(module_name).app)
+        command.name = name
+        command.help = help_text
+        # Completion install options belong to the top-level command only
+        command.params = [p for p in command.params if p.name not in ("install_completion", "show_completion")]
+        self.commands[name] = command
+        return command
+
+
+app = typer.Typer(
+    cls=LazyGroup,
+    help=HELP,
+    epilog=EPILOG
 )
 
-# Define lazy loading functions for each command group
-def lazy_new(): from cli import new; return new.app
-def lazy_run(): from cli import run; return run.app
-def lazy_devices(): from cli import devices; return devices.app
-def lazy_export(): from cli import export; return export.app
-def lazy_config(): from cli import config; return config.app
-def lazy_menu(): from cli import menu; return menu.app
-def lazy_info(): from cli import info; return info.app
-def lazy_doctor(): from cli import doctor; return doctor.app
-def lazy_validate(): from cli import validate; return validate.app
-def lazy_delete(): from cli import delete; return delete.app
-def lazy_export(): from cli import export; return export.app
-def lazy_archive(): from cli import archive; return archive.app
-def lazy_test(): from cli import test; return test.app
-def lazy_assets(): from cli import assets; return assets.app
-
-
-
-# Register subcommands using lazy loaders
-app.add_typer(lazy_new(), name="new", help="Create new experiments from standardized templates (Cookiecutter)")
-app.add_typer(lazy_run(), name="run", help="Execute experimental sessions with real-time synchronization")
-app.add_typer(lazy_devices(), name="devices", help="Configure and list available hardware interfaces")
-app.add_typer(lazy_export(), name="export", help="Export experimental data and metadata for analysis or archiving")
-app.add_typer(lazy_config(), name="config", help="Edit or inspect system-wide experimental configuration")
-app.add_typer(lazy_menu(), name="menu", help="Launch the interactive XTIM terminal menu")
-app.add_typer(lazy_info(), name="info", help="View and summarize experiment metadata and settings")
-app.add_typer(lazy_doctor(), name="doctor", help="Run diagnostic checks for XTIM environment")
-app.add_typer(lazy_validate(), name="validate", help="Validate experiment structure and metadata")
-app.add_typer(lazy_delete(), name="delete", help="Delete experiments from LABORATORY")
-app.add_typer(lazy_export(), name="export", help="Export experiments as compressed archives")
-app.add_typer(lazy_archive(), name="archive", help="Archive experiments into the ARCHIVE folder")
-app.add_typer(lazy_test(), name="test", help="Run integrated system tests")
-app.add_typer(lazy_assets(), name="assets", help="Manage and generate assets.txt files for experiments")
+@app.callback()
+def main():
+    pass
 
 
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ import typer
 from pathlib import Path
 import subprocess
 import sys
+import time
 
 app = typer.Typer(help="Execute official XTIM experiments")
 
@@ -43,53 +44,65 @@ def list_experiments():
 @app.command("check")
 def check_environment(
     name: str = typer.Argument(..., help="Name of the experiment to validate (e.g. core-screen)"),
-    exp: str = typer.Option(..., "--exp", "-e", help="Experiment name inside LABORATORY or ARCHIVE")
+    exp: str = typer.Option(None, "--exp", "-e", help="Experiment name inside LABORATORY or ARCHIVE"),
+    path: Path = typer.Option(None, "--path", "-p", help="Manual path to the experiment folder"),
+    device: str = typer.Option(None, "--device", help="Check this device backend instead (core, neo or none)"),
+    neo_address: str = typer.Option(None, "--neo-address", help="NEO host[:port] instead of cache/discovery"),
+    deadline: float = typer.Option(2.0, "--deadline", help="Seconds after which unfinished checks fail"),
+    as_json: bool = typer.Option(False, "--json", help="Print the report as JSON")
 ):
     """
-    Validate if the experiment environment is ready to launch.
+    Validate if the experiment environment is ready to launch (all checks in parallel).
     """
+    import json
+    from rich import print as rprint
+    from rich.table import Table
+    from experiments import preflight
+
     if name not in EXPERIMENT_SCRIPTS:
         typer.echo(f"[red]❌ Unknown experiment: {name}[/red]")
-        raise typer.Exit()
-
-    exp_path = resolve_experiment_path(exp)
-    script = EXPERIMENT_PATH / EXPERIMENT_SCRIPTS[name]
-
-    checks = [script.exists(), exp_path.exists()]
-    if not checks[0]:
-        typer.echo(f"[red]❌ Script missing: {script}[/red]")
-    if not checks[1]:
-        typer.echo(f"[red]❌ Experiment folder missing: {exp_path}[/red]")
-
-    # Specific checks
-    if "screen" in name and not (exp_path / "OBJECTS").exists():
-        typer.echo(f"[red]❌ Missing OBJECTS folder in: {exp_path}[/red]")
-
-    if "asset" in name and not (exp_path / "assets.txt").exists():
-        typer.echo(f"[red]❌ Missing assets.txt in: {exp_path}[/red]")
-
-    if "core" in name:
-        try:
-            import zmq
-            import requests
-        except ImportError:
-            typer.echo("[red]❌ Required libraries for Core (zmq, requests) not found.[/red]")
+        raise typer.Exit(code=1)
+    if path is None and exp is None:
+        typer.echo("[red]❌ You must provide either --path or --exp[/red]")
+        raise typer.Exit(code=1)
 
-    if "neo" in name:
-        try:
-            from pupil_labs.realtime_api.simple import discover_one_device
-            discover_one_device()
-        except:
-            typer.echo("[red]❌ NEO device not detected or library missing.[/red]")
+    exp_path = path if path else resolve_experiment_path(exp)
+    checks = preflight.preflight_checks(name, exp_path, device=device, neo_address=neo_address,
+                                        script=EXPERIMENT_PATH / EXPERIMENT_SCRIPTS[name])
+    start = time.perf_counter()
+    results = preflight.run_checks(checks, deadline=deadline)
+    elapsed = time.perf_counter() - start
+    ready = preflight.ready(results)
 
-    if all(checks):
-        typer.echo(f"[green]✅ Environment ready for '{name}' in '{exp}'[/green]")
+    if as_json:
+        typer.echo(json.dumps({"protocol": name, "experiment": str(exp_path), "ready": ready,
+                               "seconds": round(elapsed, 3),
+                               "checks": [{**r._asdict(), "seconds": round(r.seconds, 3)} for r in results]}, indent=2))
+    else:
+        icons = {preflight.OK: "[green]✔[/green]", preflight.WARN: "[yellow]⚠[/yellow]", preflight.FAIL: "[red]✘[/red]"}
+        table = Table(title=f"Preflight: {name} @ {exp_path}")
+        table.add_column("Check", style="cyan")
+        table.add_column("", justify="center")
+        table.add_column("Detail")
+        table.add_column("Time", justify="right", style="dim")
+        for r in results:
+            table.add_row(r.name, icons[r.status], r.detail, f"{r.seconds * 1000:.0f} ms")
+        rprint(table)
+        if ready:
+            rprint(f"[green]✅ Environment ready for '{name}' ({elapsed:.2f} s)[/green]")
+        else:
+            rprint(f"[red]❌ Not ready for '{name}' ({elapsed:.2f} s)[/red]")
+    if not ready:
+        raise typer.Exit(code=1)
 
 @app.command("start")
 def start(
     name: str = typer.Argument(..., help="Name of the experiment to run (e.g. core-screen)"),
     path: Path = typer.Option(None, "--path", "-p", help="Manual path to assets (e.g. c:/experiment)"),
-    exp: str = typer.Option(None, "--exp", "-e", help="Experiment name inside LABORATORY or ARCHIVE")
+    exp: str = typer.Option(None, "--exp", "-e", help="Experiment name inside LABORATORY or ARCHIVE"),
+    resume: bool = typer.Option(False, "--resume", help="Continue an aborted session from its last completed trial"),
+    daemon: bool = typer.Option(False, "--daemon", "-d", help="Submit to the resident runner (xtim run daemon start)"),
+    port: int = typer.Option(50300, "--port", help="Runner port (with --daemon)")
 ):
     """
     Start a predefined XTIM experiment.
@@ -108,7 +121,13 @@ def start(
         typer.echo(f"[red]❌ Script not found: {script}[/red]")
         raise typer.Exit()
 
+    if daemon:
+        _submit_to_daemon(name, output_path, resume, port)
+        return
+
     command = [sys.executable, str(script), str(output_path)]
+    if resume:
+        command.append("--resume")
     typer.echo(f"🚀 Launching experiment: [bold]{name}[/bold]")
     typer.echo(f"📁 Output path: {output_path}")
     typer.echo(f"▶ Command: {' '.join(command)}")
@@ -119,3 +138,129 @@ def start(
     except subprocess.CalledProcessError as e:
         typer.echo(f"[red]❌ Experiment failed: {e}[/red]")
         raise typer.Exit(code=1)
+
+
+@app.command("batch")
+def batch(
+    name: str = typer.Argument(..., help="Protocol to run for every entry (e.g. core-screen)"),
+    file: Path = typer.Option(..., "--file", "-f", help="CSV with experiment, participant, block per line"),
+    device: str = typer.Option(None, "--device", help="Override the device backend (core, neo or none)"),
+    neo_address: str = typer.Option(None, "--neo-address", help="NEO host[:port] instead of discovery")
+):
+    """
+    Run (experiment, participant, block) entries back to back in one process.
+    """
+    from experiments import batch as batch_mod
+
+    if name not in EXPERIMENT_SCRIPTS:
+        typer.echo(f"[red]❌ Experiment '{name}' not found. Use 'xtim run list' to see available.[/red]")
+        raise typer.Exit(code=1)
+    if not file.exists():
+        typer.echo(f"[red]❌ Batch file not found: {file}[/red]")
+        raise typer.Exit(code=1)
+
+    entries = batch_mod.load_batch(file)
+    missing = sorted({e.experiment for e in entries if not (LAB_PATH / e.experiment).exists()})
+    if missing:
+        typer.echo(f"[red]❌ Not found in LABORATORY: {', '.join(missing)}[/red]")
+        raise typer.Exit(code=1)
+
+    runner = batch_mod.BatchRunner(name, lambda experiment: LAB_PATH / experiment, device=device,
+                                   neo_address=neo_address)
+    try:
+        runner.run(entries)
+    except KeyboardInterrupt:
+        typer.echo("[yellow]⚠ Batch interrupted.[/yellow]")
+    batch_mod.save_summary(runner.results, file.with_name(f"{file.stem}_summary.csv"))
+    if any(r["status"] != "ok" for r in runner.results) or len(runner.results) < len(entries):
+        raise typer.Exit(code=1)
+
+
+def _submit_to_daemon(name, output_path, resume, port):
+    from experiments import runner
+
+    request = {"cmd": "run", "name": name, "target": str(Path(output_path).resolve()), "resume": resume}
+    typer.echo(f"🚀 Submitting experiment to runner: [bold]{name}[/bold]")
+    try:
+        result = runner.request(request, (runner.DEFAULT_ADDRESS[0], port),
+                                on_log=lambda text: typer.echo(text, nl=False))
+    except (ConnectionRefusedError, OSError, EOFError):
+        typer.echo(f"[red]❌ No runner reachable on port {port}. Start one with 'xtim run daemon start'.[/red]")
+        raise typer.Exit(code=1)
+    if not result["ok"]:
+        typer.echo(f"[red]❌ Experiment failed: {result['error']}[/red]")
+        raise typer.Exit(code=1)
+    typer.echo(f"[green]✅ Experiment completed in {result['seconds']:.1f} s.[/green]")
+
+# -------------------------------------------------------------------
+# Subcommand: xtim run daemon start/stop/status
+# -------------------------------------------------------------------
+daemon_app = typer.Typer(help="Resident runner with PsychoPy and devices prewarmed")
+app.add_typer(daemon_app, name="daemon")
+
+@daemon_app.command("start")
+def daemon_start(
+    window: bool = typer.Option(False, "--window", help="Keep a presentation window open between sessions"),
+    device: str = typer.Option(None, "--device", help="Keep 'core' or 'neo' connected between sessions"),
+    neo_address: str = typer.Option(None, "--neo-address", help="NEO host[:port] instead of discovery"),
+    port: int = typer.Option(50300, "--port", help="Local port to listen on"),
+    background: bool = typer.Option(False, "--background", "-b", help="Detach into its own process/console")
+):
+    """
+    Start the resident runner (foreground unless --background).
+    """
+    from experiments import runner
+
+    address = (runner.DEFAULT_ADDRESS[0], port)
+    if runner.is_running(address):
+        typer.echo(f"[yellow]⚠ A runner is already listening on port {port}.[/yellow]")
+        raise typer.Exit()
+    if device not in (None, "core", "neo"):
+        typer.echo("[red]❌ --device must be 'core' or 'neo'[/red]")
+        raise typer.Exit(code=1)
+
+    if not background:
+        runner.Runner(address, keep_window=window, device=device, neo_address=neo_address).serve()
+        return
+
+    command = [sys.executable, "-m", "experiments.runner", "--port", str(port)]
+    if window:
+        command.append("--window")
+    if device:
+        command += ["--device", device]
+    if neo_address:
+        command += ["--neo-address", neo_address]
+    # Own console on Windows, so prompts of asset protocols stay usable
+    detach = {"creationflags": subprocess.CREATE_NEW_CONSOLE} if sys.platform == "win32" else {"start_new_session": True}
+    process = subprocess.Popen(command, cwd=Path(__file__).parent.parent, **detach)
+    typer.echo(f"🔥 Runner starting in background (pid {process.pid}). Check with 'xtim run daemon status'.")
+
+@daemon_app.command("status")
+def daemon_status(port: int = typer.Option(50300, "--port", help="Runner port")):
+    """
+    Show whether a runner is up, what it keeps open and what it is running.
+    """
+    from experiments import runner
+
+    try:
+        status = runner.request({"cmd": "status"}, (runner.DEFAULT_ADDRESS[0], port))
+    except (ConnectionRefusedError, OSError, EOFError):
+        typer.echo("💤 No runner running.")
+        raise typer.Exit(code=1)
+    typer.echo(f"📡 Runner pid {status['pid']}, up {status['uptime']:.0f} s, {status['sessions']} session(s) run")
+    typer.echo(f"   Window open: {status['window']}  Device: {status['device'] or '-'}")
+    typer.echo(f"   Running: {status['running'] or '-'}  Queued: {status['queued']}")
+
+@daemon_app.command("stop")
+def daemon_stop(port: int = typer.Option(50300, "--port", help="Runner port")):
+    """
+    Stop the runner after the current session.
+    """
+    from experiments import runner
+
+    try:
+        runner.request({"cmd": "stop"}, (runner.DEFAULT_ADDRESS[0], port))
+    except (ConnectionRefusedError, OSError, EOFError):
+        typer.echo("💤 No runner running.")
+        raise typer.Exit(code=1)
+    typer.echo("🛑 Runner stopping.")
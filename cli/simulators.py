@@ -0,0 +1,314 @@
+# cli/simulators.py
+
+# =============================================================================
+# XTIM – Experimental Toolkit for Multimodal Neuroscience
+# =============================================================================
+# Part of the XSCAPE Project (Experimental Science for Cognitive and Perceptual Exploration)
+#
+# Developed by:
+#   - Arturo-José Valiño
+#   - Rubén Álvarez-Mosquera
+# =============================================================================
+
+"""
+Local stand-ins for lab hardware, used by benchmarks and latency tests.
+"""
+
+import json
+import random
+import socket
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import zmq
+
+
+class Latency:
+    """
+    Injected response delay: `mean_ms` plus Gaussian jitter (`jitter_ms` SD),
+    never negative.
+    """
+
+    def __init__(self, mean_ms=0.0, jitter_ms=0.0, seed=None):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+
+    def sample(self):
+        if not self.mean_ms and not self.jitter_ms:
+            return 0.0
+        return max(0.0, self._rng.gauss(self.mean_ms, self.jitter_ms)) / 1000
+
+    def wait(self):
+        delay = self.sample()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class _JSONServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server dispatching "METHOD /path" to `routes` callables that
+    take the decoded JSON body and return (status, payload).
+    """
+    daemon_threads = True
+
+    def __init__(self, address, routes, latency):
+        self.routes = routes
+        self.latency = latency
+        self.hits = 0
+        super().__init__(address, _JSONHandler)
+
+    def serve_in_thread(self):
+        thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True)
+        thread.start()
+        return thread
+
+class _JSONHandler(BaseHTTPRequestHandler):
+
+    def _dispatch(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        route = self.server.routes.get(f"{method} {self.path.split('?')[0]}")
+        self.server.latency.wait()
+        self.server.hits += 1
+        if route is None:
+            status, payload = 404, {"message": f"Unknown endpoint {self.path}"}
+        else:
+            try:
+                status, payload = route(json.loads(body) if body else {})
+            except ValueError as e:
+                status, payload = 400, {"message": str(e)}
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PupilRemoteEmulator:
+    """
+    Minimal Pupil Remote: a ZMQ REP socket answering "t", "R", "r", "PUB_PORT",
+    "SUB_PORT" and "notify." messages, plus a SUB socket on the PUB port that
+    counts the annotations published by experiments. With `http_port`, the
+    recording/export endpoints used by `xtim devices pupil` are served too.
+    Every REP and HTTP reply is delayed by `latency`.
+    """
+
+    def __init__(self, port=50020, pub_port=None, host="127.0.0.1", http_port=None, latency=None):
+        self.host = host
+        self.port = port
+        self.latency = latency or Latency()
+        self.context = zmq.Context()
+        self.rep = self.context.socket(zmq.REP)
+        self.rep.bind(f"tcp://{host}:{port}")
+        self.sub = self.context.socket(zmq.SUB)
+        self.sub.setsockopt_string(zmq.SUBSCRIBE, "")
+        if pub_port:
+            self.sub.bind(f"tcp://{host}:{pub_port}")
+            self.pub_port = pub_port
+        else:
+            self.pub_port = self.sub.bind_to_random_port(f"tcp://{host}")
+
+        self.recording = False
+        self.requests = 0
+        self.notifications = 0
+        self.annotations = 0
+        self._start = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+        self.http = None
+        if http_port:
+            self.http = _JSONServer((host, http_port), {
+                "GET /recording/start": lambda body: self._http_recording(True),
+                "GET /recording/stop": lambda body: self._http_recording(False),
+                "GET /export/manual": lambda body: (200, {"message": "Export started"}),
+                "GET /time": lambda body: (200, {"pupil_time": self.pupil_time()})
+            }, self.latency)
+
+    def _http_recording(self, recording):
+        self.recording = recording
+        return 200, {"recording": recording}
+
+    def start(self):
+        self._thread.start()
+        if self.http is not None:
+            self.http.serve_in_thread()
+        return self
+
+    def pupil_time(self):
+        return time.monotonic() - self._start
+
+    def reply(self, frames):
+        """
+        Build the reply for one request (a list of message frames).
+        """
+        cmd = frames[0].decode("utf-8", errors="replace")
+        if cmd == "t":
+            return repr(self.pupil_time())
+        if cmd == "PUB_PORT":
+            return str(self.pub_port)
+        if cmd == "SUB_PORT":
+            return str(self.pub_port)
+        if cmd.startswith("R"):
+            self.recording = True
+            return "OK"
+        if cmd == "r":
+            self.recording = False
+            return "OK"
+        if cmd.startswith("notify."):
+            self.notifications += 1
+            return "Notification received"
+        return "Unknown command."
+
+    def _serve(self):
+        poller = zmq.Poller()
+        poller.register(self.rep, zmq.POLLIN)
+        poller.register(self.sub, zmq.POLLIN)
+        while not self._stop.is_set():
+            for sock, _ in poller.poll(100):
+                if sock is self.rep:
+                    frames = self.rep.recv_multipart()
+                    self.requests += 1
+                    self.latency.wait()
+                    self.rep.send_string(self.reply(frames))
+                else:
+                    self.sub.recv_multipart()
+                    self.annotations += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if self.http is not None:
+            self.http.shutdown()
+            self.http.server_close()
+        self.rep.close(linger=0)
+        self.sub.close(linger=0)
+        self.context.term()
+
+
+class NeoEmulator:
+    """
+    Stand-in for the Pupil NEO Companion realtime API: HTTP on `port`
+    (/api/status, /api/event, /api/recording:start|stop_and_save|cancel) and a
+    TCP time-echo server on `time_echo_port`. The device clock runs
+    `clock_offset_ms` ahead of this machine. Replies are delayed by `latency`.
+    Connect with NeoDispatcher(host, port); mDNS discovery is not emulated.
+    """
+
+    def __init__(self, port=8080, time_echo_port=12321, host="127.0.0.1", clock_offset_ms=0.0, latency=None):
+        self.host = host
+        self.port = port
+        self.time_echo_port = time_echo_port
+        self.clock_offset_ns = int(clock_offset_ms * 1e6)
+        self.latency = latency or Latency()
+        self.recording_id = None
+        self.events = 0
+        self.echoes = 0
+        self._stop = threading.Event()
+
+        self.http = _JSONServer((host, port), {
+            "GET /api/status": self._status,
+            "POST /api/event": self._event,
+            "POST /api/recording:start": self._recording_start,
+            "POST /api/recording:stop_and_save": self._recording_stop,
+            "POST /api/recording:cancel": self._recording_stop
+        }, self.latency)
+        self.echo = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.echo.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.echo.bind((host, time_echo_port))
+        self.echo.listen()
+        self.echo.settimeout(0.1)
+        self._thread = threading.Thread(target=self._serve_echo, daemon=True)
+
+    def start(self):
+        self.http.serve_in_thread()
+        self._thread.start()
+        return self
+
+    def device_time_ns(self):
+        return time.time_ns() + self.clock_offset_ns
+
+    # HTTP ─────────────────────────────────────
+
+    def _status(self, body):
+        components = [
+            {"model": "Phone", "data": {
+                "battery_level": 100, "battery_state": "OK", "device_id": "xtim-sim",
+                "device_name": "XTIM Simulator", "ip": self.host, "memory": 2 ** 34,
+                "memory_state": "OK", "time_echo_port": self.time_echo_port}},
+            {"model": "Hardware", "data": {
+                "version": "2.0", "glasses_serial": "sim", "world_camera_serial": "sim",
+                "module_serial": "sim"}}
+        ]
+        if self.recording_id:
+            components.append({"model": "Recording", "data": {
+                "action": "START", "id": self.recording_id, "message": "", "rec_duration_ns": 0}})
+        return 200, {"message": "Success", "result": components}
+
+    def _event(self, body):
+        if "name" not in body:
+            raise ValueError("Event needs a name")
+        self.events += 1
+        timestamp = body.get("timestamp") or self.device_time_ns()
+        return 200, {"message": "Event sent.", "result": {
+            "name": body["name"], "recording_id": self.recording_id, "timestamp": timestamp}}
+
+    def _recording_start(self, body):
+        if self.recording_id:
+            return 400, {"message": "Recording already running"}
+        self.recording_id = str(uuid.uuid4())
+        return 200, {"message": "Recording started", "result": {"id": self.recording_id}}
+
+    def _recording_stop(self, body):
+        if not self.recording_id:
+            return 400, {"message": "No recording running"}
+        recording_id, self.recording_id = self.recording_id, None
+        return 200, {"message": "Recording stopped", "result": {"id": recording_id}}
+
+    # Time echo ────────────────────────────────
+    # Request: client time (ms, uint64 big-endian). Reply: the same value
+    # followed by the device time in ms.
+
+    def _serve_echo(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self.echo.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            threading.Thread(target=self._echo, args=(conn,), daemon=True).start()
+
+    def _echo(self, conn):
+        with conn:
+            while not self._stop.is_set():
+                request = conn.recv(8, socket.MSG_WAITALL)
+                if len(request) < 8:
+                    return
+                self.latency.wait()
+                self.echoes += 1
+                client_ms, = struct.unpack("!Q", request)
+                conn.sendall(struct.pack("!QQ", client_ms, self.device_time_ns() // 1_000_000))
+
+    def stop(self):
+        self._stop.set()
+        self.http.shutdown()
+        self.http.server_close()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.echo.close()
@@ -56,3 +56,90 @@ def test_fpd(
     """
     from cli.tests import test_fpd as fpd
     fpd.run(file)
+
+@app.command("bench")
+def test_bench(
+    trials: int = typer.Option(200, "--trials", "-n", help="Number of trials to present"),
+    unique: int = typer.Option(20, "--unique", help="Number of distinct generated stimuli"),
+    width: int = typer.Option(640, "--width", help="Stimulus width in pixels"),
+    height: int = typer.Option(480, "--height", help="Stimulus height in pixels"),
+    refresh: float = typer.Option(60.0, "--refresh", help="Simulated refresh rate (Hz)"),
+    realtime: bool = typer.Option(False, "--realtime", help="Pace flips at the real refresh rate instead of a virtual clock"),
+    device: str = typer.Option("core", "--device", help="Emulated eye tracker: core or none"),
+    port: int = typer.Option(50120, "--port", help="Port for the emulated Pupil Remote"),
+    prepared: bool = typer.Option(False, "--prepared", help="Load stimuli prepared by stimprep instead of decoding PNGs")
+):
+    """
+    Headless benchmark of the screen-protocol loop with stub window and emulated devices.
+    """
+    import importlib.util
+
+    # The stub window replaces the display, but the engine and its stimulus
+    # cache still import PsychoPy, Pillow and pylsl when they load
+    missing = [name for name in ("psychopy", "PIL", "pylsl", "zmq", "msgpack")
+               if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"[yellow]⚠️  Bench skipped: {', '.join(missing)} not installed "
+              f"(needed by experiments.commons and experiments.engine).[/yellow]")
+        print("[dim]🛈 Install config/requirements.txt in this environment to run it.[/dim]")
+        return
+    from cli.tests import test_bench as bench
+    if device not in ("core", "none"):
+        print("[red]❌ --device must be 'core' or 'none'[/red]")
+        raise typer.Exit(1)
+    bench.run(trials, unique, (width, height), refresh, realtime, device, port, prepared)
+
+@app.command("startup")
+def test_startup(
+    args: str = typer.Option("--help", "--args", help="xtim arguments to time, e.g. 'run --help'"),
+    repeats: int = typer.Option(5, "--repeats", "-r", help="Number of cold invocations"),
+    target: float = typer.Option(0.5, "--target", help="Maximum median startup time in seconds")
+):
+    """
+    Benchmark cold CLI startup and check that subcommands are loaded lazily.
+    """
+    from cli.tests import test_startup as startup
+    if not startup.run(args.split(), repeats, target):
+        raise typer.Exit(1)
+
+@app.command("ttl")
+def test_ttl(
+    port: str = typer.Option(None, "--port", help="Trigger serial port (default: a pseudo-terminal stand-in)"),
+    markers: int = typer.Option(200, "--markers", "-n", help="Number of triggers to send"),
+    interval: float = typer.Option(20.0, "--interval", help="Milliseconds between triggers"),
+    pulse: float = typer.Option(10.0, "--pulse", help="Pulse width in milliseconds"),
+    baudrate: int = typer.Option(115200, "--baud", help="Serial baud rate")
+):
+    """
+    Send TTL triggers through the marker bus and measure write latency and pulse width.
+    """
+    from cli.tests import test_ttl as ttl
+    if not ttl.run(port, markers, interval, pulse, baudrate):
+        raise typer.Exit(1)
+
+@app.command("resume")
+def test_resume(
+    stimuli: int = typer.Option(6, "--stimuli", "-n", help="Number of trials in the schedule"),
+    aborted: int = typer.Option(2, "--aborted-after", help="Trials completed before the simulated abort")
+):
+    """
+    Check that --resume only counts trials logged for the current schedule.
+    """
+    from cli.tests import test_resume as resume
+    if not resume.run(stimuli, aborted):
+        raise typer.Exit(1)
+
+@app.command("neo-clock")
+def test_neo_clock(
+    offset: float = typer.Option(500.0, "--offset", help="Clock offset of the NEO stand-in in ms"),
+    tolerance: float = typer.Option(20.0, "--tolerance", help="Largest accepted error in ms"),
+    port: int = typer.Option(8090, "--port", help="HTTP port of the NEO stand-in"),
+    echo_port: int = typer.Option(12390, "--echo-port", help="Time-echo port of the NEO stand-in"),
+    latency: float = typer.Option(5.0, "--latency", help="Injected time-echo latency in ms")
+):
+    """
+    Check NEO device timestamps against a stand-in whose clock is offset by a known amount.
+    """
+    from cli.tests import test_neo_clock as neo_clock
+    if not neo_clock.run(offset, tolerance, port, echo_port, latency):
+        raise typer.Exit(1)
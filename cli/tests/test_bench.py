@@ -0,0 +1,266 @@
+# cli/tests/test_bench.py
+
+# =============================================================================
+# XTIM – Experimental Toolkit for Multimodal Neuroscience
+# =============================================================================
+# Part of the XSCAPE Project (Experimental Science for Cognitive and Perceptual Exploration)
+#
+# Developed by:
+#   - Arturo-José Valiño
+#   - Rubén Álvarez-Mosquera
+# =============================================================================
+
+import sys
+import os
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+import numpy as np
+from PIL import Image
+from rich import print
+from rich.table import Table
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from experiments import commons as cm
+from experiments import engine, stimprep
+from cli.simulators import PupilRemoteEmulator
+
+STAGES = ("stim lookup", "draw", "marker emit", "screenshot", "wait")
+
+
+class StageTimer:
+    """
+    Accumulate main-thread CPU time and wall time per loop stage.
+    """
+
+    def __init__(self):
+        self.cpu_ns = defaultdict(int)
+        self.wall_ns = defaultdict(int)
+        self.calls = defaultdict(int)
+
+    def add(self, stage, cpu_ns, wall_ns):
+        self.cpu_ns[stage] += cpu_ns
+        self.wall_ns[stage] += wall_ns
+        self.calls[stage] += 1
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            cpu, wall = time.thread_time_ns(), time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.thread_time_ns() - cpu, time.perf_counter_ns() - wall)
+        return timed
+
+
+class StubOutlet:
+    """
+    Stands in for pylsl.StreamOutlet.
+    """
+
+    def __init__(self):
+        self.samples = 0
+
+    def push_sample(self, sample, timestamp=0.0, pushthrough=True):
+        self.samples += 1
+
+
+class StubWindow:
+    """
+    Stands in for visual.Window. Flips either advance a virtual clock by one
+    frame (fast) or sleep until the next frame boundary (`realtime`).
+    """
+
+    def __init__(self, size, refresh_hz, timer, realtime=False):
+        self.size = size
+        self.frame_period = 1.0 / refresh_hz
+        self.timer = timer
+        self.realtime = realtime
+        self.movieFrames = []
+        self.back = None
+        self._front = None
+        self._to_call = []
+        self._frame_time = 0.0
+        self._virtual = 0.0
+        self._next = time.perf_counter()
+
+    def callOnFlip(self, function, *args, **kwargs):
+        self._to_call.append((function, args, kwargs))
+
+    def timeOnFlip(self, obj, attrib, format=float):
+        self.callOnFlip(lambda: setattr(obj, attrib, format(self._frame_time)))
+
+    def flip(self):
+        cpu, wall = time.thread_time_ns(), time.perf_counter_ns()
+        if self.realtime:
+            self._next += self.frame_period
+            delay = self._next - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.perf_counter()
+        else:
+            self._virtual += self.frame_period
+            now = self._virtual
+        self._front, self.back = self.back, None
+        self._frame_time = now
+        self.timer.add("wait", time.thread_time_ns() - cpu, time.perf_counter_ns() - wall)
+
+        for function, args, kwargs in self._to_call:
+            function(*args, **kwargs)
+        del self._to_call[:]
+        return now
+
+    def getMovieFrame(self, buffer="front"):
+        pixels = self._front if buffer == "front" else self.back
+        frame = Image.fromarray(pixels) if pixels is not None else Image.new("RGBA", self.size)
+        self.movieFrames.append(frame)
+        return frame
+
+    def getActualFrameRate(self, **kwargs):
+        return 1.0 / self.frame_period
+
+    def close(self):
+        pass
+
+
+class StubImageStim:
+    """
+    Stands in for visual.ImageStim: the RGBA pixel copy plays the texture upload.
+    """
+
+    def __init__(self, win, image=None, timer=None):
+        self.win = win
+        self.texture = np.array(image.convert("RGBA"))
+        self.draw = timer.wrap("draw", self._draw)
+
+    def _draw(self):
+        self.win.back = self.texture
+
+
+class BenchSession(engine.Session):
+    """
+    engine.Session with a stub window, stub LSL outlet and per-stage timers.
+    """
+
+    def __init__(self, protocol, backend, timer, size, refresh_hz, realtime, prepared=False):
+        super().__init__(protocol, backend=backend)
+        self.timer = timer
+        self.size = size
+        self.refresh_hz = refresh_hz
+        self.realtime = realtime
+        self.prepared = prepared
+
+    def _make_outlet(self):
+        return StubOutlet()
+
+    def _setup_screen(self):
+        self.win = StubWindow(self.size, self.refresh_hz, self.timer, self.realtime)
+        self.scheduler = cm.FrameScheduler(self.win, self.refresh_hz)
+        self.scheduler.recorder = cm.FrameRecorder(self._frame_capacity(), self.scheduler.frame_period)
+        self.welcome_image = self.goodbye_image = None
+
+        factory = lambda win, image: StubImageStim(win, image=image, timer=self.timer)
+        prepared = stimprep.load_manifest(self.protocol.target) if self.prepared else None
+        self.cache = cm.StimulusCache(self.win, budget_mb=self.config["cache_budget_mb"], prepared=prepared,
+                                      stim_factory=factory)
+        # Cold loads happen in preload (or the refill thread), not per trial:
+        # the loop itself only looks up stimuli that are already uploaded.
+        # A prepared array is memory-mapped, so its pages are read by the upload
+        self.cache._decode = self.timer.wrap("image decode", self.cache._decode)
+        self.cache._upload = self.timer.wrap("upload", self.cache._upload)
+        self.cache.preload(trial.stimulus for trial in self.protocol.pending)
+        self.screenshots = cm.ScreenshotWriter()
+
+        self.cache.get = self.timer.wrap("stim lookup", self.cache.get)
+        self.screenshots.capture = self.timer.wrap("screenshot", self.screenshots.capture)
+
+    def bench(self):
+        """
+        Run the START → trial loop → END part of a screen session.
+        Returns (loop wall seconds, loop CPU seconds).
+        """
+        try:
+            self.setup()
+            self.markers.emit = self.timer.wrap("marker emit", self.markers.emit)
+            self._start()
+            wall, cpu = time.perf_counter(), time.thread_time()
+            self._screen_loop()
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            self._log(-1, "END", "", self.markers.emit("END"))
+            self.screenshots.close()
+            self._finish()
+            return wall, cpu
+        finally:
+            self.close()
+
+
+def make_experiment(root, unique, size, prepared=False):
+    """
+    Create a throw-away experiment folder with random PNG stimuli, converted
+    with `stimprep.prepare` for a `size` display when `prepared` is set.
+    """
+    stim_dir = root / "OBJECTS" / "pseudorandom"
+    stim_dir.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    for i in range(unique):
+        pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(stim_dir / f"stim_{i:03d}.png")
+    if prepared:
+        (root / "config").mkdir()
+        (root / "config" / "display-conf.yml").write_text(f"monitor:\n  resolution: [{size[0]}, {size[1]}]\n")
+        stimprep.prepare(root)
+    return root
+
+def run(trials=200, unique=20, size=(640, 480), refresh_hz=60.0, realtime=False, device="core", port=50120,
+        prepared=False):
+    """
+    Benchmark the screen-protocol loop headlessly and report CPU time per trial stage,
+    plus the cold load time per stimulus (PNG decode or prepared array).
+    """
+    print("\n[bold cyan]XTIM — Headless Presentation-Loop Benchmark[/bold cyan]")
+    print(f"[dim]{trials} trials, {unique} unique {size[0]}x{size[1]} "
+          f"{'prepared' if prepared else 'PNG'} stimuli, {refresh_hz:g} Hz, "
+          f"{'real-time' if realtime else 'virtual'} flips, device: {device}[/dim]\n")
+
+    emulator = PupilRemoteEmulator(port=port).start() if device == "core" else None
+    backend = engine.CoreBackend(port=port) if device == "core" else engine.NullBackend()
+    timer = StageTimer()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="xtim-bench-") as tmp:
+            target = make_experiment(Path(tmp), unique, size, prepared)
+            config = {"n_repeats": max(1, trials // unique), "stim_time": 1.0, "blank_time": 0.4}
+            protocol = engine.Protocol("core-screen", target, config=config, device=device)
+            session = BenchSession(protocol, backend, timer, size, refresh_hz, realtime, prepared)
+            loop_wall, loop_cpu = session.bench()
+    finally:
+        if emulator is not None:
+            emulator.stop()
+
+    n = len(protocol.trials)
+    table = Table(title="Per-trial cost by stage (main thread)")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Calls", justify="right")
+    table.add_column("CPU µs/trial", justify="right")
+    table.add_column("Wall µs/trial", justify="right")
+    for stage in STAGES:
+        table.add_row(stage, str(timer.calls[stage]),
+                      f"{timer.cpu_ns[stage] / n / 1000:.1f}", f"{timer.wall_ns[stage] / n / 1000:.1f}")
+    print(table)
+
+    overhead = loop_wall - timer.wall_ns["wait"] / 1e9
+    print(f"  🔁 Trials            : {n}")
+    print(f"  ⏱️  Loop wall time    : {loop_wall:.3f} s")
+    print(f"  🧮 Loop CPU time     : {loop_cpu:.3f} s")
+    print(f"  📈 Overhead/trial    : {overhead / n * 1e6:.1f} µs (wall, excluding flips)")
+    loads = timer.calls["image decode"]
+    if loads:
+        decode_ms = timer.wall_ns["image decode"] / loads / 1e6
+        upload_ms = timer.wall_ns["upload"] / max(1, timer.calls["upload"]) / 1e6
+        print(f"  🖼️  Cold load         : {decode_ms:.2f} ms decode + {upload_ms:.2f} ms upload ({loads} stimuli)")
+    if emulator is not None:
+        print(f"  👁️  Annotations seen  : {emulator.annotations}")
@@ -0,0 +1,70 @@
+# cli/tests/test_neo_clock.py
+
+# =============================================================================
+# XTIM – Experimental Toolkit for Multimodal Neuroscience
+# =============================================================================
+# Part of the XSCAPE Project (Experimental Science for Cognitive and Perceptual Exploration)
+#
+# Developed by:
+#   - Arturo-José Valiño
+#   - Rubén Álvarez-Mosquera
+# =============================================================================
+
+"""
+NEO clock check: connects a `neo.NeoDispatcher` to the NEO stand-in, whose
+clock runs a known offset ahead of this machine and answers time echoes with
+injected latency, and compares the device times XTIM computes with the
+stand-in's own clock: directly, and through the `clocksync.ClockSync` model
+that flip markers use. A reversed offset sign is off by twice the offset, and
+a model fitted around the whole echo estimate by half its duration; both fail.
+"""
+
+from rich import print
+from rich.table import Table
+
+
+def run(clock_offset_ms=500.0, tolerance_ms=20.0, port=8090, echo_port=12390, latency_ms=5.0, probes=3):
+    """
+    Returns True when every device time is within `tolerance_ms` of the stand-in clock.
+    """
+    from psychopy import core
+    from cli.simulators import Latency, NeoEmulator
+    from experiments import clocksync
+    from experiments.neo import NeoDispatcher
+
+    print("\n[bold cyan]XTIM — NEO Clock Offset Check[/bold cyan]")
+    emulator = NeoEmulator(port=port, time_echo_port=echo_port, clock_offset_ms=clock_offset_ms,
+                           latency=Latency(latency_ms)).start()
+    try:
+        dispatcher = NeoDispatcher("127.0.0.1", port)
+        sync = clocksync.ClockSync()
+        sync.add("neo", clocksync.neo_probe(dispatcher), timed=True)
+        sync.sample("neo", probes)
+        rows = []
+        for name, device_time in (("NeoDispatcher.device_time", dispatcher.device_time),
+                                  ("ClockSync model (neo_probe)", lambda: sync.to_device("neo", core.getTime()))):
+            computed = device_time()
+            actual = emulator.device_time_ns() / 1e9
+            rows.append((name, (computed - actual) * 1000.0))
+        measured_ms = dispatcher.offset_ms
+        dispatcher.close()
+    finally:
+        emulator.stop()
+
+    table = Table(title=f"NEO clock {clock_offset_ms:+.0f} ms from this machine, {latency_ms:.0f} ms echo latency")
+    table.add_column("Conversion", style="cyan")
+    table.add_column("Error", justify="right")
+    table.add_row("measured time_offset_ms", f"{measured_ms:+.1f} ms (local - NEO)")
+    ok = True
+    for name, error_ms in rows:
+        passed = abs(error_ms) <= tolerance_ms
+        ok = ok and passed
+        style = "green" if passed else "red"
+        table.add_row(name, f"[{style}]{error_ms:+.1f} ms[/{style}]")
+    print(table)
+
+    if ok:
+        print(f"[green]🟢 Device times within {tolerance_ms:.0f} ms of the NEO clock.[/green]")
+    else:
+        print("[red]❌ Device times off the NEO clock (offset sign or clock model wrong?).[/red]")
+    return ok
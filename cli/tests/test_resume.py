@@ -0,0 +1,95 @@
+# cli/tests/test_resume.py
+
+# =============================================================================
+# XTIM – Experimental Toolkit for Multimodal Neuroscience
+# =============================================================================
+# Part of the XSCAPE Project (Experimental Science for Cognitive and Perceptual Exploration)
+#
+# Developed by:
+#   - Arturo-José Valiño
+#   - Rubén Álvarez-Mosquera
+# =============================================================================
+
+"""
+Resume check: replays session logs for a throwaway screen experiment and
+verifies that `--resume` only counts the trials of the current schedule,
+not those of an earlier full session in the same output folder, and that
+every resumed segment gets its own report suffix.
+"""
+
+import tempfile
+from pathlib import Path
+from rich import print
+from rich.table import Table
+
+
+def _make_experiment(root, stimuli):
+    pseudorandom = root / "OBJECTS" / "pseudorandom"
+    pseudorandom.mkdir(parents=True)
+    for i in range(stimuli):
+        (pseudorandom / f"object_{i:02d}.png").touch()
+
+def _play(protocol, trials):
+    """
+    Log the first `trials` pending trials as the session loop does, then stop.
+    """
+    from experiments.sessionlog import SessionLog, LOG_NAME
+
+    log = SessionLog(protocol.output_dir / LOG_NAME, resume=protocol.resumed)
+    log.append(-1, "START" if not protocol.resumed else "RESUME")
+    for trial in protocol.pending[:trials]:
+        log.append(trial.index, "stim", trial.name)
+        log.append(trial.index, "blank", trial.name)
+    log.close()
+
+def run(stimuli=6, aborted_after=2):
+    """
+    Full session, fresh session aborted after `aborted_after` trials, resume,
+    abort again after one more trial, resume. Also resumes a fresh session
+    that crashed before logging anything.
+    Returns True when every resume starts at the right trial.
+    """
+    from experiments.engine import Protocol
+
+    print("\n[bold cyan]XTIM — Resume Check[/bold cyan]")
+    config = {"n_repeats": 1, "shuffle": True}
+    cases = []
+    with tempfile.TemporaryDirectory(prefix="xtim_resume_") as tmp:
+        root = Path(tmp)
+        _make_experiment(root, stimuli)
+
+        _play(Protocol("core-screen", root, config, device="none"), stimuli)
+        _play(Protocol("core-screen", root, config, device="none"), aborted_after)
+        resumed = Protocol("core-screen", root, config, device="none", resume=True)
+        cases.append(("aborted after a full session", aborted_after, 1, resumed))
+
+        _play(resumed, 1)
+        resumed = Protocol("core-screen", root, config, device="none", resume=True)
+        cases.append(("aborted again after resuming", aborted_after + 1, 2, resumed))
+
+        _play(resumed, stimuli)
+        Protocol("core-screen", root, config, device="none")
+        resumed = Protocol("core-screen", root, config, device="none", resume=True)
+        cases.append(("crashed before the first trial", 0, 1, resumed))
+
+    table = Table(title=f"{stimuli}-trial schedule")
+    table.add_column("Case", style="cyan")
+    table.add_column("Expected completed", justify="right")
+    table.add_column("Completed", justify="right")
+    table.add_column("Pending", justify="right")
+    table.add_column("Reports", justify="right")
+    ok = True
+    for case, expected, segment, protocol in cases:
+        passed = (protocol.completed == expected and len(protocol.pending) == stimuli - expected
+                  and protocol.segment == segment)
+        ok = ok and passed
+        style = "green" if passed else "red"
+        table.add_row(case, str(expected), f"[{style}]{protocol.completed}[/{style}]", str(len(protocol.pending)),
+                      protocol.report_file("frame_report.csv").name)
+    print(table)
+
+    if ok:
+        print("[green]🟢 Resume skips exactly the trials of the aborted schedule.[/green]")
+    else:
+        print("[red]❌ Resume counted trials of another session or reused a segment's reports.[/red]")
+    return ok
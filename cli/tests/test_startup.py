@@ -0,0 +1,83 @@
+# cli/tests/test_startup.py
+
+# =============================================================================
+# XTIM – Experimental Toolkit for Multimodal Neuroscience
+# =============================================================================
+# Part of the XSCAPE Project (Experimental Science for Cognitive and Perceptual Exploration)
+#
+# Developed by:
+#   - Arturo-José Valiño
+#   - Rubén Álvarez-Mosquera
+# =============================================================================
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from rich import print
+from rich.table import Table
+
+base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def time_invocation(args):
+    """
+    Wall time (s) of one fresh `python -m cli.main <args>` process.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "cli.main", *args], cwd=base_path,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def import_profile(args):
+    """
+    Top-level imports of one invocation as (cumulative µs, module), from -X importtime.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "cli.main", *args], cwd=base_path,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules.append((int(match.group(2)), match.group(4), len(match.group(3))))
+    return modules
+
+def run(args=("--help",), repeats=5, target=0.5, top=10):
+    """
+    Time cold `xtim` invocations and check the median against `target` seconds.
+    Returns True when the target is met and no subcommand module was imported
+    other than the one being invoked.
+    """
+    args = list(args)
+    print(f"\n[bold cyan]XTIM — CLI Startup Benchmark[/bold cyan]  [dim]xtim {' '.join(args)}[/dim]\n")
+    time_invocation(args)  # warm the bytecode cache
+    times = [time_invocation(args) for _ in range(repeats)]
+    median = statistics.median(times)
+
+    modules = import_profile(args)
+    shallowest = min((depth for _, _, depth in modules), default=0)
+    top_level = sorted(((us, name) for us, name, depth in modules if depth == shallowest), reverse=True)
+
+    table = Table(title=f"Slowest top-level imports (of {len(modules)} modules)")
+    table.add_column("Module", style="cyan")
+    table.add_column("Cumulative ms", justify="right")
+    for us, name in top_level[:top]:
+        table.add_row(name, f"{us / 1000:.1f}")
+    print(table)
+
+    invoked = f"cli.{args[0]}" if args and not args[0].startswith("-") else None
+    eager = sorted({name for _, name, _ in modules if name.startswith("cli.") and name != "cli.main"
+                    and not (invoked and name.startswith(invoked))})
+
+    print(f"  ⏱️  Runs              : {', '.join(f'{t * 1000:.0f}' for t in times)} ms")
+    print(f"  📊 Median            : {median * 1000:.0f} ms (target {target * 1000:.0f} ms)")
+    if eager:
+        print(f"  [yellow]⚠️  Eagerly imported  : {', '.join(eager)}[/yellow]")
+
+    passed = median <= target and not eager
+    print("  [green]✅ Startup within target[/green]" if passed else "  [red]❌ Startup target missed[/red]")
+    return passed
@@ -0,0 +1,155 @@
+# cli/tests/test_ttl.py
+
+# =============================================================================
+# XTIM – Experimental Toolkit for Multimodal Neuroscience
+# =============================================================================
+# Part of the XSCAPE Project (Experimental Science for Cognitive and Perceptual Exploration)
+#
+# Developed by:
+#   - Arturo-José Valiño
+#   - Rubén Álvarez-Mosquera
+#
+# This software is designed to facilitate the creation, execution, and analysis
+# of neuroscience experiments involving eye-tracking, EEG, and other modalities.
+# It integrates with hardware and software tools such as Pupil Labs, Emobit,
+# and MilliKey MH5, providing a unified command-line interface and interactive
+# menu system for experiment management.
+#
+# For more information about the XSCAPE project, please refer to the project's
+# documentation or contact the developers.
+# =============================================================================
+
+"""
+TTL trigger check: drives `ttl.TTLSink` through a marker bus and reports the
+write latency and pulse widths. Without a port it runs against a pseudo-terminal
+(Linux/macOS), whose other end stands in for the amplifier and timestamps
+every byte, so the publish-to-wire delay and the byte sequence are checked too.
+"""
+
+import os
+import threading
+import time
+from rich import print
+from rich.table import Table
+
+
+class PtyAmplifier:
+    """
+    Read side of a pseudo-terminal; records (byte, perf_counter_ns) as they arrive.
+    """
+
+    def __init__(self):
+        import tty
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.received = []
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        while True:
+            try:
+                data = os.read(self.master, 64)
+            except OSError:
+                return
+            now = time.perf_counter_ns()
+            if not data:
+                return
+            self.received.extend((byte, now) for byte in data)
+
+    def close(self):
+        os.close(self.slave)
+        os.close(self.master)
+
+
+def _summary(values_ns):
+    values = sorted(values_ns)
+    if not values:
+        return "-"
+    p50 = values[len(values) // 2] / 1000
+    p99 = values[min(len(values) - 1, int(len(values) * 0.99))] / 1000
+    return f"p50 {p50:8.1f} µs   p99 {p99:8.1f} µs   max {values[-1] / 1000:8.1f} µs"
+
+def _format(summary):
+    if not summary["count"]:
+        return "-"
+    return f"p50 {summary['p50_us']:8.1f} µs   p99 {summary['p99_us']:8.1f} µs   max {summary['max_us']:8.1f} µs"
+
+def run(port=None, markers=200, interval_ms=20.0, pulse_ms=10.0, baudrate=115200):
+    """
+    Send `markers` triggers `interval_ms` apart. Returns True when every
+    trigger arrived intact (pty) or was written without failure (real port).
+    """
+    from experiments import commons as cm
+    from experiments import ttl
+
+    print("\n[bold cyan]XTIM — TTL Trigger Test[/bold cyan]")
+    amplifier = None
+    if port is None:
+        if os.name != "posix":
+            print("[red]❌ No pseudo-terminals on this platform; pass --port with a trigger device.[/red]")
+            return False
+        amplifier = PtyAmplifier()
+        port = amplifier.port
+        print(f"[dim]Using pseudo-terminal {port} as the amplifier.[/dim]")
+    else:
+        print(f"[dim]Writing to {port}; connect the amplifier to check the pulses there.[/dim]")
+
+    labels = [f"stim_{i}" for i in range(markers)]
+    codes = {label: bytes([1 + i % ttl.MAX_STIMULUS_CODE]) for i, label in enumerate(labels)}
+    sink = ttl.TTLSink(ttl.open_port(port, baudrate), codes, pulse_ms=pulse_ms)
+    bus = cm.MarkerBus([sink])
+    time.sleep(0.05)
+    if amplifier is not None:
+        amplifier.received.clear()
+
+    published = []
+    for label in labels:
+        published.append(time.perf_counter_ns())
+        bus.publish(label, time.perf_counter())
+        time.sleep(interval_ms / 1000.0)
+    bus.flush()
+    time.sleep(2 * pulse_ms / 1000.0)
+    stats = sink.stats()
+    sink.close()
+
+    table = Table(title=f"{markers} triggers, {pulse_ms:.1f} ms pulses, every {interval_ms:.1f} ms")
+    table.add_column("Measure", style="cyan")
+    table.add_column("Result")
+    table.add_row("write + flush", _format(sink.write_latency.summary()))
+    table.add_row("enqueue → written", _format(sink.latency.summary()))
+    ok = stats["failed"] == 0 and stats["dropped"] == 0
+
+    if amplifier is not None:
+        received = list(amplifier.received)
+        amplifier.close()
+        arrivals = [(byte, t) for byte, t in received if byte]
+        resets = [t for byte, t in received if not byte]
+        expected = [code[0] for code in codes.values()]
+        intact = [byte for byte, _ in arrivals] == expected and len(resets) >= len(arrivals)
+        wire = [t - t0 for (_, t), t0 in zip(arrivals, published)]
+        widths = []
+        high = None
+        for byte, t in received:
+            if byte:
+                high = t
+            elif high is not None:
+                widths.append(t - high)
+                high = None
+        table.add_row("publish → on the wire", _summary(wire))
+        if widths:
+            table.add_row("pulse width", f"mean {sum(widths) / len(widths) / 1e6:.2f} ms   "
+                                         f"min {min(widths) / 1e6:.2f} ms   max {max(widths) / 1e6:.2f} ms")
+        table.add_row("sequence", f"{len(arrivals)}/{markers} codes, {len(resets)} resets, "
+                                  f"{'in order' if intact else 'MISMATCH'}")
+        ok = ok and intact
+    table.add_row("counters", ", ".join(f"{key} {value}" for key, value in stats.items()))
+    print(table)
+
+    if ok:
+        print("[green]🟢 Triggers delivered.[/green]")
+    else:
+        print("[red]❌ Triggers lost or out of order.[/red]")
+    return ok
@@ -0,0 +1,144 @@
+# experiments/batch.py
+
+"""
+Batch Sessions for XTIM Experiments
+Runs a list of (experiment, participant, block) entries of one protocol
+back to back in a single process. The window, LSL outlet, stimulus cache and
+device connection are created once and shared; each entry writes into
+<experiment>/__output__/<participant>/block_<block>.
+"""
+
+import csv
+import time
+from collections import namedtuple
+from pathlib import Path
+from experiments import commons as cm
+from experiments import engine
+
+BatchEntry = namedtuple("BatchEntry", "experiment participant block")
+
+SUMMARY_FIELDS = ["experiment", "participant", "block", "status", "setup_s", "stimuli_s", "total_s", "output"]
+
+
+def load_batch(filename):
+    """
+    Read batch entries from a CSV with columns experiment, participant, block
+    (header optional, '#' starts a comment line).
+    """
+    entries = []
+    with open(filename, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            row = [cell.strip() for cell in row]
+            if not row or not row[0] or row[0].startswith("#"):
+                continue
+            if [cell.lower() for cell in row[:3]] == ["experiment", "participant", "block"]:
+                continue
+            if len(row) < 3:
+                raise ValueError(f"Batch line needs experiment, participant, block: {','.join(row)}")
+            entries.append(BatchEntry(*row[:3]))
+    return entries
+
+def output_dir(target, entry):
+    return Path(target) / "__output__" / entry.participant / f"block_{entry.block}"
+
+
+class BatchRunner:
+    """
+    Run batch entries of protocol `name`; `resolve(experiment)` maps an
+    experiment name to its folder.
+    """
+
+    def __init__(self, name, resolve, device=None, neo_address=None):
+        self.spec = engine.PROTOCOLS[name]
+        self.name = name
+        self.resolve = resolve
+        self.device = device or self.spec["device"]
+        self.neo_address = neo_address
+        self.win = None
+        self.cache = None
+        self.outlet = None
+        self.backend = None
+        self.results = []
+
+    def _open(self):
+        start = time.perf_counter()
+        if self.device == "neo" and self.neo_address:
+            host, _, port = self.neo_address.partition(":")
+            self.backend = engine.NeoBackend(host, int(port or 8080))
+        else:
+            self.backend = engine.BACKENDS[self.device]()
+        if self.spec["mode"] == "screen":
+            print("🖥️  Opening PsychoPy window for the batch...")
+            self.win = engine.open_window()
+            self.cache = cm.StimulusCache(self.win, budget_mb=engine.DEFAULT_CONFIG["cache_budget_mb"])
+        return time.perf_counter() - start
+
+    def run(self, entries):
+        """
+        Run every entry in order; a failed entry is reported and the batch goes on.
+        Returns the list of per-entry result dicts.
+        """
+        shared_setup = self._open()
+        print(f"📋 Batch of {len(entries)} session(s), shared setup {shared_setup:.2f} s")
+        try:
+            for i, entry in enumerate(entries, 1):
+                print(f"\n▶ [{i}/{len(entries)}] {entry.experiment} · participant {entry.participant} "
+                      f"· block {entry.block}")
+                self.results.append(self._run_entry(entry))
+        finally:
+            self.close()
+        return self.results
+
+    def _run_entry(self, entry):
+        start = time.perf_counter()
+        result = {"experiment": entry.experiment, "participant": entry.participant, "block": entry.block,
+                  "status": "ok", "output": ""}
+        session = None
+        try:
+            target = self.resolve(entry.experiment)
+            protocol = engine.Protocol(self.name, target, device=self.device, output_dir=output_dir(target, entry))
+            result["output"] = str(protocol.output_dir)
+            session = engine.Session(protocol, backend=self.backend, win=self.win, keep_backend=True,
+                                     outlet=self.outlet, cache=self.cache)
+            session.run()
+        except KeyboardInterrupt:
+            raise
+        except (Exception, SystemExit) as e:
+            result["status"] = f"failed: {e}"
+            print(f"❌ {entry.experiment}/{entry.participant}/{entry.block} failed: {e}")
+        finally:
+            if session is not None:
+                self.outlet = session.lsl_out
+                result["setup_s"] = round(session.timings.get("setup", float("nan")), 3)
+                result["stimuli_s"] = round(session.timings.get("stimuli", float("nan")), 3)
+            result["total_s"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.win is not None:
+            self.win.close()
+
+def save_summary(results, filename):
+    """
+    Write per-entry timings as CSV and print setup vs stimulus totals.
+    """
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, restval="")
+        writer.writeheader()
+        writer.writerows(results)
+
+    done = [r for r in results if r["status"] == "ok"]
+    setup = sum(r["setup_s"] for r in done)
+    stimuli = sum(r["stimuli_s"] for r in done)
+    total = sum(r["total_s"] for r in results)
+    print(f"\n📊 Batch: {len(done)}/{len(results)} session(s) completed in {total:.1f} s")
+    if done:
+        print(f"   ⚙️  Setup   : {setup:.1f} s total, {setup / len(done):.2f} s per session")
+        print(f"   🎞️  Stimuli : {stimuli:.1f} s total, {stimuli / len(done):.2f} s per session")
+        session_time = sum(r["total_s"] for r in done)
+        print(f"   📈 Setup share of session time: {100 * setup / max(session_time, 1e-9):.1f}%")
+    print(f"📝 Summary saved to {filename}")
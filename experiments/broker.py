@@ -0,0 +1,482 @@
+# experiments/broker.py
+
+"""
+Device Broker for XTIM
+A long-lived local process that owns the connections to Pupil Capture
+(Pupil Remote + annotation PUB), the Pupil NEO (realtime API dispatcher),
+the Pupil Capture HTTP endpoints (pooled keep-alive session) and the LSL
+marker outlets. Experiments and CLI commands talk to it over ZMQ:
+request/reply on `endpoint` and fire-and-forget markers on its marker
+endpoint, so sessions reuse warm connections instead of reconnecting and
+rediscovering devices every time.
+
+Clock conversion stays in the experiment process: markers arrive already
+stamped in the LSL, Pupil or NEO clock.
+"""
+
+import argparse
+import os
+import queue
+import socket
+import threading
+import time
+from types import SimpleNamespace
+import msgpack
+import zmq
+from experiments.devicecache import USER_DIR
+from experiments.latency import LatencyHistogram
+
+if os.name == "nt":
+    DEFAULT_ENDPOINT = "tcp://127.0.0.1:50310"
+else:
+    DEFAULT_ENDPOINT = f"ipc://{USER_DIR / 'broker'}"
+
+# Requests that wait on a device or the network (discovery, recording control,
+# delivery flushes) run on the broker's worker thread, so the poll loop keeps
+# relaying markers while they are pending.
+SLOW_OPS = {"connect", "pupil_command", "pupil_time", "neo_offset", "neo_recording", "neo_flush", "http"}
+
+
+def marker_endpoint(endpoint):
+    """
+    Endpoint of the marker (PUSH/PULL) channel that belongs to `endpoint`.
+    """
+    if endpoint.startswith("tcp://"):
+        host, port = endpoint.rsplit(":", 1)
+        return f"{host}:{int(port) + 1}"
+    return f"{endpoint}-markers"
+
+def available(endpoint=DEFAULT_ENDPOINT, timeout=0.5):
+    """
+    True if a broker answers on `endpoint`. Fails fast when nothing listens.
+    """
+    if endpoint.startswith("ipc://"):
+        if not os.path.exists(endpoint[len("ipc://"):]):
+            return False
+    elif endpoint.startswith("tcp://"):
+        host, port = endpoint[len("tcp://"):].rsplit(":", 1)
+        try:
+            socket.create_connection((host, int(port)), timeout=timeout).close()
+        except OSError:
+            return False
+    client = BrokerClient(endpoint, timeout=timeout)
+    try:
+        client.request("ping")
+        return True
+    except (BrokerError, TimeoutError):
+        return False
+    finally:
+        client.close()
+
+
+class BrokerError(RuntimeError):
+    pass
+
+
+# ─────────────────────────────────────────────
+# BROKER PROCESS
+# ─────────────────────────────────────────────
+
+class DeviceBroker:
+    """
+    Serve device requests on `endpoint` until a "stop" request arrives.
+    `pupil` = (ip, port) and `neo` = True or "host:port" connect at startup;
+    other devices are connected on the first "connect" request.
+    SLOW_OPS are answered from a worker thread, one at a time and in order;
+    markers and the other requests are handled by the poll loop itself.
+    """
+
+    def __init__(self, endpoint=DEFAULT_ENDPOINT, pupil=None, neo=None, http_timeout=2.0):
+        import requests
+
+        self.endpoint = endpoint
+        self.http = requests.Session()
+        self.http_timeout = http_timeout
+        self.pupil = None
+        self.pupil_address = None
+        self.neo = None
+        self.outlets = {}
+        self.counts = {"requests": 0, "lsl": 0, "annotation": 0, "neo_event": 0}
+        self.started = time.time()
+        self._warm = {"pupil": pupil, "neo": neo}
+
+        if endpoint.startswith("ipc://"):
+            # The socket file lives in the per-user directory, closed to other users
+            USER_DIR.mkdir(parents=True, exist_ok=True)
+            os.chmod(USER_DIR, 0o700)
+        self.context = zmq.Context.instance()
+        self.router = self.context.socket(zmq.ROUTER)
+        self.router.bind(endpoint)
+        self.pull = self.context.socket(zmq.PULL)
+        self.pull.bind(marker_endpoint(endpoint))
+        # The worker hands its replies back here; only the poll loop uses the ROUTER
+        self._replies_endpoint = f"inproc://xtim-broker-replies-{id(self)}"
+        self.replies = self.context.socket(zmq.PULL)
+        self.replies.bind(self._replies_endpoint)
+        self._jobs = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._work, name="broker-worker", daemon=True)
+        self._stop = False
+
+    # Connections ──────────────────────────────
+
+    def _connect_pupil(self, ip="127.0.0.1", port=50020):
+        from experiments import commons as cm
+
+        if self.pupil is None or self.pupil_address != (ip, port):
+            # Swapped before closing: the poll loop may be publishing on the old one
+            previous, self.pupil = self.pupil, cm.PupilRemote(ip, port)
+            self.pupil_address = (ip, port)
+            if previous is not None:
+                previous.close()
+            print(f"👁️  Pupil Remote connected at {ip}:{port}")
+        return self.pupil
+
+    def _connect_neo(self, address=None):
+        from experiments import devicecache
+        from experiments.neo import NeoDispatcher
+
+        if self.neo is None:
+            if address:
+                host, _, port = address.partition(":")
+                host, port = host, int(port or 8080)
+            else:
+                host, port = devicecache.find_neo()
+            self.neo = NeoDispatcher(host, port)
+            print(f"📡 NEO connected at {host}:{port}")
+        return self.neo
+
+    def _outlet(self, stream):
+        stream = tuple(stream)
+        if stream not in self.outlets:
+            from pylsl import StreamInfo, StreamOutlet
+
+            name, stream_type, source_id = stream
+            self.outlets[stream] = StreamOutlet(StreamInfo(name, stream_type, 1, 0, "string", source_id))
+            print(f"📤 LSL outlet {name} ({stream_type}) created")
+        return self.outlets[stream]
+
+    # Requests ─────────────────────────────────
+
+    def op_ping(self):
+        return {"pid": os.getpid()}
+
+    def op_status(self):
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started,
+            "pupil": "%s:%s" % self.pupil_address if self.pupil is not None else None,
+            "neo": f"{self.neo.address}:{self.neo.port}" if self.neo is not None else None,
+            "outlets": [name for name, _, _ in self.outlets],
+            "counts": self.counts
+        }
+
+    def op_connect(self, device, ip="127.0.0.1", port=50020, address=None):
+        if device == "core":
+            self._connect_pupil(ip, port)
+        elif device == "neo":
+            self._connect_neo(address)
+        else:
+            raise BrokerError(f"Unknown device '{device}'")
+        return {}
+
+    def op_outlet(self, stream):
+        self._outlet(stream)
+        return {}
+
+    def op_pupil_command(self, cmd):
+        return {"reply": self._require("pupil").command(cmd)}
+
+    def op_pupil_time(self):
+        return {"time": float(self._require("pupil").command("t"))}
+
+    def op_neo_offset(self):
+        self._require("neo").estimate_time_offset()
+        return {"offset_ms": self.neo.offset_ms}
+
+    def op_neo_recording(self, action):
+        neo = self._require("neo")
+        if action == "start":
+            return {"id": neo.recording_start()}
+        neo.flush()
+        return {"id": neo.recording_stop_and_save()}
+
+    def op_neo_flush(self):
+        neo = self._require("neo")
+        neo.flush()
+        return {"delivery": neo.latency.summary(), "failed": len(neo.failed)}
+
+    def op_http(self, url):
+        response = self.http.get(url, timeout=self.http_timeout)
+        return {"status": response.status_code, "text": response.text[:4096]}
+
+    def op_stop(self):
+        self._stop = True
+        return {}
+
+    def _require(self, device):
+        connection = self.pupil if device == "pupil" else self.neo
+        if connection is None:
+            raise BrokerError(f"{device} is not connected; send 'connect' first")
+        return connection
+
+    def _handle(self, message):
+        op = message.pop("op", None)
+        handler = getattr(self, f"op_{op}", None)
+        if handler is None:
+            return {"ok": False, "error": f"Unknown op '{op}'"}
+        try:
+            return {"ok": True, **handler(**message)}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    # Markers ──────────────────────────────────
+
+    def _marker(self, message):
+        op = message["op"]
+        self.counts[op] = self.counts.get(op, 0) + 1
+        if op == "lsl":
+            self._outlet(message["stream"]).push_sample(message["sample"], message["timestamp"])
+        elif op == "annotation" and self.pupil is not None:
+            self.pupil.publish(message["label"], message["timestamp"], message.get("duration", 0.0),
+                               message.get("tags", ()))
+        elif op == "neo_event" and self.neo is not None:
+            self.neo.send(message["label"], message["timestamp_ns"] / 1e9)
+
+    def _relay_pending(self):
+        while self.pull.poll(0):
+            self._marker(msgpack.unpackb(self.pull.recv(), raw=False))
+
+    # Worker ───────────────────────────────────
+
+    def _work(self):
+        replies = self.context.socket(zmq.PUSH)
+        replies.setsockopt(zmq.LINGER, 0)
+        replies.connect(self._replies_endpoint)
+        try:
+            for identity, empty, message in iter(self._jobs.get, None):
+                reply = self._handle(message)
+                replies.send_multipart([identity, empty, msgpack.packb(reply, use_bin_type=True)])
+        finally:
+            replies.close()
+
+    def serve(self):
+        if self._warm["pupil"]:
+            self._connect_pupil(*self._warm["pupil"])
+        if self._warm["neo"]:
+            self._connect_neo(self._warm["neo"] if isinstance(self._warm["neo"], str) else None)
+        self._worker.start()
+        print(f"🔌 XTIM device broker on {self.endpoint} (pid {os.getpid()})")
+
+        poller = zmq.Poller()
+        poller.register(self.router, zmq.POLLIN)
+        poller.register(self.pull, zmq.POLLIN)
+        poller.register(self.replies, zmq.POLLIN)
+        try:
+            while not self._stop:
+                for sock, _ in poller.poll(200):
+                    if sock is self.pull:
+                        self._marker(msgpack.unpackb(self.pull.recv(), raw=False))
+                    elif sock is self.replies:
+                        self.router.send_multipart(self.replies.recv_multipart())
+                    else:
+                        identity, empty, payload = self.router.recv_multipart()
+                        message = msgpack.unpackb(payload, raw=False)
+                        self.counts["requests"] += 1
+                        if message.get("op") in SLOW_OPS:
+                            # Markers pushed before the request are relayed before it runs
+                            self._relay_pending()
+                            self._jobs.put((identity, empty, message))
+                        else:
+                            reply = self._handle(message)
+                            self.router.send_multipart([identity, empty, msgpack.packb(reply, use_bin_type=True)])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self, timeout=5.0):
+        self._jobs.put(None)
+        if self._worker.is_alive():
+            self._worker.join(timeout)
+        # Deliver markers still queued before the connections go away
+        self._relay_pending()
+        if self.pupil is not None:
+            self.pupil.close()
+        if self.neo is not None:
+            self.neo.close()
+        self.http.close()
+        self.router.close(linger=0)
+        self.pull.close(linger=0)
+        self.replies.close(linger=0)
+        print(f"🛑 Broker stopped ({self.counts['lsl']} LSL, {self.counts['annotation']} Pupil, "
+              f"{self.counts['neo_event']} NEO markers relayed).")
+
+
+# ─────────────────────────────────────────────
+# CLIENT SIDE
+# ─────────────────────────────────────────────
+
+class BrokerClient:
+    """
+    Requests with a reply timeout, plus non-blocking marker pushes.
+    """
+
+    def __init__(self, endpoint=DEFAULT_ENDPOINT, timeout=2.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.context = zmq.Context.instance()
+        self._lock = threading.Lock()
+        self._push_lock = threading.Lock()
+        self._req = self._connect_req()
+        self._push = self.context.socket(zmq.PUSH)
+        self._push.setsockopt(zmq.LINGER, 1000)
+        self._push.connect(marker_endpoint(endpoint))
+
+    def _connect_req(self):
+        req = self.context.socket(zmq.REQ)
+        req.setsockopt(zmq.LINGER, 0)
+        req.connect(self.endpoint)
+        return req
+
+    def request(self, op, timeout=None, **kwargs):
+        """
+        Send a request and return the reply dict; raises BrokerError on failure.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            self._req.send(msgpack.packb({"op": op, **kwargs}, use_bin_type=True))
+            if not self._req.poll(int(timeout * 1000)):
+                # A REQ socket without reply is stuck; start over with a fresh one
+                self._req.close()
+                self._req = self._connect_req()
+                raise TimeoutError(f"Broker did not answer '{op}' within {timeout:.1f} s")
+            reply = msgpack.unpackb(self._req.recv(), raw=False)
+        if not reply.pop("ok"):
+            raise BrokerError(reply["error"])
+        return reply
+
+    def push(self, op, **kwargs):
+        # Marker sinks push from their own worker threads; a ZMQ socket is not thread-safe
+        message = msgpack.packb({"op": op, **kwargs}, use_bin_type=True)
+        with self._push_lock:
+            self._push.send(message)
+
+    def close(self):
+        self._req.close()
+        self._push.close()
+
+
+class BrokerPupil:
+    """
+    Stands in for `commons.PupilRemote` in the experiment process: Pupil clock
+    conversion is done here, publishing happens in the broker.
+    """
+
+    def __init__(self, client, ip="127.0.0.1", port=50020):
+        from psychopy import core
+
+        self._now = core.getTime
+        self.client = client
+        client.request("connect", timeout=10.0, device="core", ip=ip, port=port)
+        self.sync = None
+        self.latency = LatencyHistogram()
+        self.offset = self.estimate_offset()
+
+    def estimate_offset(self, probes=10):
+        best_rtt, offset = None, 0.0
+        for _ in range(probes):
+            t0 = self._now()
+            pupil_time = self.client.request("pupil_time")["time"]
+            t1 = self._now()
+            if best_rtt is None or t1 - t0 < best_rtt:
+                best_rtt, offset = t1 - t0, pupil_time - (t0 + t1) / 2
+        return offset
+
+    def attach(self, sync):
+        self.sync = sync
+        sync.add("pupil", lambda: self.client.request("pupil_time")["time"])
+
+    def command(self, cmd):
+        return self.client.request("pupil_command", cmd=cmd)["reply"]
+
+    def pupil_time(self, t=None):
+        t = self._now() if t is None else t
+        if self.sync is not None and "pupil" in self.sync.models:
+            return self.sync.to_device("pupil", t)
+        return t + self.offset
+
+    def annotate(self, label, t=None, duration=0.0, tags=()):
+        start = time.perf_counter_ns()
+        self.client.push("annotation", label=label, timestamp=self.pupil_time(t), duration=duration, tags=list(tags))
+        self.latency.record(time.perf_counter_ns() - start)
+
+    def close(self):
+        pass
+
+class BrokerNeo:
+    """
+    Stands in for `neo.NeoDispatcher` in the experiment process.
+    """
+
+    def __init__(self, client, address=None):
+        self.client = client
+        client.request("connect", timeout=30.0, device="neo", address=address)
+        self.offset_ms = client.request("neo_offset", timeout=10.0)["offset_ms"]
+        self.latency = LatencyHistogram()
+        self.failed = []
+
+    def estimate_time_offset(self):
+        self.offset_ms = self.client.request("neo_offset", timeout=10.0)["offset_ms"]
+        return SimpleNamespace(time_offset_ms=SimpleNamespace(mean=self.offset_ms))
+
+    def device_time(self, t_unix=None):
+        return (time.time() if t_unix is None else t_unix) - self.offset_ms / 1000.0
+
+    def send(self, label, t_device=None):
+        t_device = self.device_time() if t_device is None else t_device
+        start = time.perf_counter_ns()
+        self.client.push("neo_event", label=label, timestamp_ns=int(t_device * 1e9))
+        self.latency.record(time.perf_counter_ns() - start)
+
+    def recording_start(self):
+        return self.client.request("neo_recording", timeout=10.0, action="start")["id"]
+
+    def recording_stop_and_save(self):
+        return self.client.request("neo_recording", timeout=30.0, action="stop_and_save")["id"]
+
+    def flush(self):
+        return self.client.request("neo_flush", timeout=30.0)
+
+    def close(self):
+        pass
+
+class BrokerOutlet:
+    """
+    Stands in for pylsl.StreamOutlet; samples are pushed by the broker.
+    """
+
+    def __init__(self, client, stream):
+        self.client = client
+        self.stream = list(stream)
+        client.request("outlet", stream=self.stream)
+
+    def push_sample(self, sample, timestamp=0.0, pushthrough=True):
+        self.client.push("lsl", stream=self.stream, sample=list(sample), timestamp=timestamp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XTIM local device broker.")
+    parser.add_argument("--endpoint", default=DEFAULT_ENDPOINT, help="ZMQ endpoint for requests")
+    parser.add_argument("--pupil", default=None, help="Connect Pupil Remote at ip[:port] on startup")
+    parser.add_argument("--neo", nargs="?", const=True, default=None,
+                        help="Connect the NEO on startup (optionally at host[:port])")
+    args = parser.parse_args()
+
+    pupil = None
+    if args.pupil:
+        ip, _, port = args.pupil.partition(":")
+        pupil = (ip, int(port or 50020))
+    DeviceBroker(args.endpoint, pupil=pupil, neo=args.neo).serve()
+
+if __name__ == "__main__":
+    main()
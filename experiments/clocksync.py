@@ -0,0 +1,170 @@
+# experiments/clocksync.py
+
+"""
+Clock Synchronisation for XTIM Experiments
+Fits the offset and linear drift of each device clock (Pupil Core, NEO, LSL)
+against the local PsychoPy clock, so markers from every source can be placed
+on one timeline without querying the devices on each call.
+"""
+
+import json
+import threading
+import time
+import numpy as np
+from psychopy import core
+
+
+# ─────────────────────────────────────────────
+# CLOCK MODEL
+# ─────────────────────────────────────────────
+
+class ClockModel:
+    """
+    Linear mapping device = local + offset + drift * (local - t_ref).
+    """
+
+    def __init__(self, offset=0.0, drift=0.0, t_ref=0.0, rtt=0.0, samples=0):
+        self.offset = offset
+        self.drift = drift
+        self.t_ref = t_ref
+        self.rtt = rtt
+        self.samples = samples
+
+    def to_device(self, t_local):
+        return t_local + self.offset + self.drift * (t_local - self.t_ref)
+
+    def to_local(self, t_device):
+        return (t_device - self.offset + self.drift * self.t_ref) / (1.0 + self.drift)
+
+    def as_dict(self):
+        return {
+            "offset": self.offset,
+            "drift": self.drift,
+            "t_ref": self.t_ref,
+            "rtt": self.rtt,
+            "samples": self.samples
+        }
+
+def fit_clock(samples, bins=20):
+    """
+    Fit a ClockModel from (t_sent, t_device, t_received) probes.
+    Probes are split into chronological bins and only the lowest round-trip
+    probe of each bin is used, which rejects samples delayed by the network.
+    """
+    s = np.asarray(samples, dtype=float)
+    rtt = s[:, 2] - s[:, 0]
+    mid = (s[:, 0] + s[:, 2]) / 2.0
+
+    best = np.array([chunk[np.argmin(rtt[chunk])] for chunk in np.array_split(np.arange(len(s)), min(bins, len(s)))])
+    t_ref = float(mid[best[0]])
+    x = mid[best] - t_ref
+    y = s[best, 1] - mid[best]
+
+    if len(best) < 3 or np.ptp(x) < 1.0:
+        return ClockModel(float(np.median(y)), 0.0, t_ref, float(np.median(rtt[best])), len(s))
+    drift, offset = np.polyfit(x, y, 1)
+    return ClockModel(float(offset), float(drift), t_ref, float(np.median(rtt[best])), len(s))
+
+
+# ─────────────────────────────────────────────
+# BACKGROUND SYNCHRONISATION
+# ─────────────────────────────────────────────
+
+class ClockSync:
+    """
+    Probe registered device clocks in the background and keep a fitted model per device.
+    A probe is a callable returning the current device time in seconds; it is
+    bracketed by local clock reads. A `timed` probe brackets its own clock
+    read and returns the whole (t_sent, t_device, t_received) sample, for
+    devices whose reading takes longer than the read it refers to.
+    """
+
+    def __init__(self, interval=2.0, probes_per_round=5, initial_probes=20):
+        self.interval = interval
+        self.probes_per_round = probes_per_round
+        self.initial_probes = initial_probes
+        self.models = {}
+        self._probes = {}
+        self._timed = set()
+        self._samples = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, name, probe, timed=False):
+        """
+        Register a device clock probe under `name`.
+        """
+        self._probes[name] = probe
+        self._samples[name] = []
+        if timed:
+            self._timed.add(name)
+
+    def sample(self, name, n=1):
+        probe = self._probes[name]
+        samples = self._samples[name]
+        for _ in range(n):
+            if name in self._timed:
+                samples.append(probe())
+                continue
+            t0 = core.getTime()
+            remote = probe()
+            t1 = core.getTime()
+            samples.append((t0, remote, t1))
+        self.models[name] = fit_clock(samples)
+
+    def start(self):
+        """
+        Fit every registered clock once, then keep refining in the background.
+        """
+        for name in self._probes:
+            self.sample(name, self.initial_probes)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for name in list(self._probes):
+                try:
+                    self.sample(name, self.probes_per_round)
+                except Exception as e:
+                    print(f"[CLOCK SYNC] Probe '{name}' failed: {e}")
+
+    def to_device(self, name, t_local):
+        """
+        Map a local (PsychoPy) time onto the clock of device `name`.
+        """
+        return self.models[name].to_device(t_local)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def save(self, filename):
+        """
+        Write the fitted models as JSON next to the session output.
+        """
+        data = {
+            "local_clock": "psychopy.core.getTime",
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "models": {name: model.as_dict() for name, model in self.models.items()}
+        }
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+def neo_probe(device):
+    """
+    Build a timed probe for a NEO device from the realtime API time-echo
+    estimate (register it with `timed=True`). The estimate already corrects
+    for the round trips, so only the Unix clock read it is applied to is
+    bracketed. Returns (t_sent, device time, t_received); the device time is
+    in seconds since the Unix epoch on the phone.
+    """
+    def probe():
+        offset_ms = device.estimate_time_offset().time_offset_ms.mean
+        t0 = core.getTime()
+        # time_offset_ms is the local clock minus the Companion clock
+        t_device = time.time() - offset_ms / 1000.0
+        t1 = core.getTime()
+        return t0, t_device, t1
+    return probe
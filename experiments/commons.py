@@ -7,10 +7,24 @@ Provides utilities for Pupil Labs control, timing, stimulus logging, and frame r
 
 import time
 import os
+import shutil
+import hashlib
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import numpy as np
 import zmq
 import requests
 import json
+import msgpack
+import yaml
+from pathlib import Path
+from PIL import Image
 from psychopy import visual, core
+from pylsl import local_clock
+from experiments import stimprep
+from experiments.latency import LatencyHistogram, save_latency_report
 
 # ─────────────────────────────────────────────
 # PATH & FILE UTILITY
@@ -22,7 +36,7 @@ def save_list_to_txt(lista, filename):
     """
     with open(filename, 'w', encoding='utf-8') as f:
         for item in lista:
-            f.write(f"{item}")
+            f.write(f"{item}\n")
 
 
 # ─────────────────────────────────────────────
@@ -80,6 +94,837 @@ def new_annotation(pupil_socket, label, tags=[]):
     ts = request_pupil_time(pupil_socket)
     notify(pupil_socket, label, timestamp=ts, tags=tags)
 
+def estimate_pupil_offset(pupil_socket, probes=10):
+    """
+    Estimate Pupil clock minus local (PsychoPy) clock from the probe with the
+    shortest round trip. Returns the offset in seconds.
+    """
+    best_rtt, offset = None, 0.0
+    for _ in range(probes):
+        t0 = core.getTime()
+        pupil_time = request_pupil_time(pupil_socket)
+        t1 = core.getTime()
+        if best_rtt is None or t1 - t0 < best_rtt:
+            best_rtt, offset = t1 - t0, pupil_time - (t0 + t1) / 2
+    return offset
+
+
+class PupilRemote:
+    """
+    Pupil Remote client that publishes annotations without waiting for a reply.
+    The offset between the local (PsychoPy) clock and the Pupil clock is estimated
+    on connect and re-estimated every `resync_interval` seconds; annotations carry
+    a locally computed Pupil timestamp and go out on the IPC backbone PUB port.
+    With a `clocksync.ClockSync`, the Pupil clock is registered there as "pupil"
+    and its drift-corrected model is used instead of the local re-estimation.
+    """
+
+    def __init__(self, ip="127.0.0.1", port=50020, resync_interval=30.0, sync=None):
+        self.context = zmq.Context.instance()
+        self._req = self.context.socket(zmq.REQ)
+        self._req.connect(f"tcp://{ip}:{port}")
+        self._req_lock = threading.Lock()
+
+        pub_port = self.command("PUB_PORT")
+        self._pub = self.context.socket(zmq.PUB)
+        self._pub.connect(f"tcp://{ip}:{pub_port}")
+
+        self.offset = self.estimate_offset()
+        self.latency = LatencyHistogram()
+        self.notify({"subject": "start_plugin", "name": "Annotation_Capture", "args": {}})
+
+        self.sync = None
+        self._stop = threading.Event()
+        self._resync_interval = resync_interval
+        self._thread = None
+        if sync is not None:
+            self.attach(sync)
+        else:
+            self._thread = threading.Thread(target=self._resync_loop, daemon=True)
+            self._thread.start()
+
+    def attach(self, sync):
+        """
+        Register the Pupil clock with `sync`, e.g. the ClockSync of the next session
+        when the connection outlives a session.
+        """
+        self.sync = sync
+        sync.add("pupil", lambda: float(self.command("t")))
+
+    def command(self, cmd):
+        """
+        Send a Pupil Remote command (e.g. "R", "r", "PUB_PORT") and return the reply.
+        """
+        with self._req_lock:
+            self._req.send_string(cmd)
+            return self._req.recv_string()
+
+    def notify(self, notification):
+        """
+        Send a notification dict through Pupil Remote.
+        """
+        with self._req_lock:
+            self._req.send_string(f"notify.{notification['subject']}", flags=zmq.SNDMORE)
+            self._req.send(msgpack.packb(notification, use_bin_type=True))
+            return self._req.recv_string()
+
+    def estimate_offset(self, probes=10):
+        with self._req_lock:
+            return estimate_pupil_offset(self._req, probes=probes)
+
+    def pupil_time(self, t=None):
+        """
+        Convert a local (PsychoPy) time, or now, into the Pupil clock.
+        """
+        t = core.getTime() if t is None else t
+        if self.sync is not None and "pupil" in self.sync.models:
+            return self.sync.to_device("pupil", t)
+        return t + self.offset
+
+    def annotate(self, label, t=None, duration=0.0, tags=()):
+        """
+        Publish an annotation stamped with `t` (PsychoPy clock), or now.
+        """
+        self.publish(label, self.pupil_time(t), duration, tags)
+
+    def publish(self, label, timestamp, duration=0.0, tags=()):
+        """
+        Publish an annotation already stamped in the Pupil clock.
+        """
+        annotation = {
+            "topic": "annotation",
+            "label": label,
+            "timestamp": timestamp,
+            "duration": duration,
+            "tags": list(tags)
+        }
+        start = time.perf_counter_ns()
+        self._pub.send_string(annotation["topic"], flags=zmq.SNDMORE)
+        self._pub.send(msgpack.packb(annotation, use_bin_type=True))
+        self.latency.record(time.perf_counter_ns() - start)
+
+    def _resync_loop(self):
+        while not self._stop.wait(self._resync_interval):
+            try:
+                self.offset = self.estimate_offset()
+            except zmq.ZMQError as e:
+                print(f"[PUPIL] Clock re-estimation failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._pub.close(linger=1000)
+        self._req.close()
+        if self.latency.count:
+            summary = self.latency.summary()
+            print(f"👁️  {summary['count']} annotations sent, send latency p50 {summary['p50_us']:.1f} µs, "
+                  f"p99 {summary['p99_us']:.1f} µs")
+
+
+# ─────────────────────────────────────────────
+# MARKER BUS
+# ─────────────────────────────────────────────
+
+MARKERS_NAME = "markers.tsv"
+
+class MarkerSink:
+    """
+    One destination of a `MarkerBus`, drained by its own worker thread.
+    `write(label, t)` gets the PsychoPy-clock time and converts it as needed.
+    At most `maxsize` markers wait; further ones are dropped and counted.
+    A write slower than `timeout` seconds is counted as late, and `flush`
+    stops waiting for the sink after `timeout`.
+    The enqueue-to-written time goes into `latency`.
+    """
+    name = "sink"
+
+    def __init__(self, timeout=0.5, maxsize=1024):
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self.queue = queue.SimpleQueue()
+        self.latency = LatencyHistogram()
+        self.written = 0
+        self.dropped = 0
+        self.late = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._drain, name=f"marker-{self.name}", daemon=True)
+        self._thread.start()
+
+    def write(self, label, t):
+        raise NotImplementedError
+
+    def idle_timeout(self):
+        """
+        Seconds the worker may wait for the next marker before `idle()` runs
+        (None waits indefinitely), e.g. to end a pulse without a new marker.
+        """
+        return None
+
+    def idle(self):
+        pass
+
+    def _drain(self):
+        get = self.queue.get
+        clock = time.perf_counter_ns
+        while True:
+            try:
+                item = get(timeout=self.idle_timeout())
+            except queue.Empty:
+                self.idle()
+                continue
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            label, t, queued_ns = item
+            start = clock()
+            try:
+                self.write(label, t)
+            except Exception as e:
+                self.failed += 1
+                print(f"[MARKERS] {self.name} failed to write '{label}': {e}")
+                continue
+            done = clock()
+            self.latency.record(done - queued_ns)
+            self.written += 1
+            if done - start > self.timeout * 1e9:
+                self.late += 1
+
+    def request_flush(self):
+        """
+        Returns an Event set once everything queued so far has been handled.
+        """
+        done = threading.Event()
+        self.queue.put(done)
+        return done
+
+    def stats(self):
+        return {"written": self.written, "dropped": self.dropped, "late": self.late,
+                "failed": self.failed, "pending": self.queue.qsize()}
+
+    def histograms(self):
+        return {self.name: self.latency}
+
+    def close(self):
+        self.queue.put(None)
+        self._thread.join(self.timeout)
+
+
+class LSLSink(MarkerSink):
+    name = "lsl"
+
+    def __init__(self, outlet, stamp, **kwargs):
+        self.outlet = outlet
+        self.stamp = stamp
+        super().__init__(**kwargs)
+
+    def write(self, label, t):
+        self.outlet.push_sample([label], self.stamp(t))
+
+class PupilSink(MarkerSink):
+    name = "pupil"
+
+    def __init__(self, pupil, **kwargs):
+        self.pupil = pupil
+        super().__init__(**kwargs)
+
+    def write(self, label, t):
+        self.pupil.annotate(label, t)
+
+class NeoSink(MarkerSink):
+    """
+    Hands events to a `neo.NeoDispatcher`, which delivers them asynchronously.
+    """
+    name = "neo"
+
+    def __init__(self, neo, stamp, **kwargs):
+        self.neo = neo
+        self.stamp = stamp
+        super().__init__(**kwargs)
+
+    def write(self, label, t):
+        self.neo.send(label, self.stamp(t))
+
+class FileSink(MarkerSink):
+    """
+    Local tab-separated marker log (label, PsychoPy time, LSL time), a record
+    that does not depend on any device or network. Overwritten unless `resume`.
+    """
+    name = "file"
+
+    def __init__(self, filename, stamp, resume=False, **kwargs):
+        self.stamp = stamp
+        # A resumed session appends to the markers of the aborted run
+        append = resume and Path(filename).exists()
+        self.file = open(filename, "a" if append else "w", encoding="utf-8", buffering=1)
+        if not append:
+            self.file.write("label\tlocal_time\tlsl_time\n")
+        super().__init__(**kwargs)
+
+    def write(self, label, t):
+        self.file.write(f"{label}\t{t:.6f}\t{self.stamp(t):.6f}\n")
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+class MarkerBus:
+    """
+    Fan markers out to independent sinks. `publish` never blocks: it puts one
+    item on each sink's queue (or counts it as dropped when that queue is
+    full), so a slow sink delays neither the others nor the caller.
+    """
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def add(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def publish(self, label, t):
+        item = (label, t, time.perf_counter_ns())
+        for sink in self.sinks:
+            if sink.queue.qsize() < sink.maxsize:
+                sink.queue.put(item)
+            else:
+                sink.dropped += 1
+
+    def flush(self):
+        """
+        Wait until every sink has written what is queued, each for at most its
+        own timeout (all sinks flush in parallel). Returns the names of the
+        sinks that did not finish in time.
+        """
+        start = time.perf_counter()
+        pending = [(sink, sink.request_flush()) for sink in self.sinks]
+        unfinished = []
+        for sink, done in pending:
+            if not done.wait(max(0.0, start + sink.timeout - time.perf_counter())):
+                unfinished.append(sink.name)
+        if unfinished:
+            print(f"⚠️  Markers still pending for: {', '.join(unfinished)}")
+        return unfinished
+
+    def stats(self):
+        return {sink.name: sink.stats() for sink in self.sinks}
+
+    def close(self):
+        self.flush()
+        for sink in self.sinks:
+            sink.close()
+
+
+# ─────────────────────────────────────────────
+# FLIP-LOCKED MARKERS
+# ─────────────────────────────────────────────
+
+class FlipMarkers:
+    """
+    Emit markers stamped with the time of the flip that shows them.
+    The flip time (PsychoPy clock) is converted into the LSL, Pupil and NEO clocks
+    by the sinks of a `MarkerBus`, each on its own worker thread (NEO then goes
+    through a `neo.NeoDispatcher`), so the renderer never waits on the network.
+    `filename` adds a local marker log (appended to with `resume`); `sinks`
+    adds further `MarkerSink`s.
+    The bus is flushed when `end_marker` ("END" by default) is emitted.
+    With a `clocksync.ClockSync`, its "lsl" and "neo" models replace the
+    offsets measured here at startup.
+    The enqueue time and every sink's delivery time are kept as
+    `latency.LatencyHistogram`s.
+    """
+    END = "END"
+
+    def __init__(self, win, lsl_outlet=None, pupil=None, neo=None, sync=None, filename=None, sinks=(),
+                 resume=False, end_marker=END):
+        self.win = win
+        self.lsl_outlet = lsl_outlet
+        self.pupil = pupil
+        self.neo = neo
+        self.sync = sync
+        self.end_marker = end_marker
+        self.lsl_offset = local_clock() - core.getTime()
+        self.neo_offset = 0.0
+        if neo is not None:
+            self.neo_offset = time.time() - core.getTime() - neo.offset_ms / 1000.0
+        self.last_time = float("nan")
+        self.flip_time = float("nan")
+        self.latency = LatencyHistogram()
+
+        self.bus = MarkerBus()
+        if lsl_outlet is not None:
+            self.bus.add(LSLSink(lsl_outlet, self.lsl_time))
+        if pupil is not None:
+            self.bus.add(PupilSink(pupil))
+        if neo is not None:
+            self.bus.add(NeoSink(neo, self.neo_time, timeout=2.0))
+        if filename is not None:
+            self.bus.add(FileSink(filename, self.lsl_time, resume=resume))
+        for sink in sinks:
+            self.bus.add(sink)
+
+    def on_flip(self, label):
+        """
+        Emit `label` right after the next `win.flip()`, stamped with the time
+        of that flip (not the time the callback happens to run).
+        """
+        # Flip callbacks run in order: the flip time is assigned before the emit reads it
+        self.win.timeOnFlip(self, "flip_time")
+        self.win.callOnFlip(self._emit_on_flip, label)
+
+    def _emit_on_flip(self, label):
+        self.emit(label, self.flip_time)
+
+    def emit(self, label, t=None):
+        """
+        Emit `label` stamped with `t` (PsychoPy clock), or now. Returns `t`.
+        """
+        if t is None:
+            t = core.getTime()
+        start = time.perf_counter_ns()
+        self.bus.publish(label, t)
+        self.latency.record(time.perf_counter_ns() - start)
+        self.last_time = t
+        if label == self.end_marker:
+            self.flush()
+        return t
+
+    def flush(self):
+        """
+        Wait for the sinks (and the NEO dispatcher behind its sink) to deliver
+        every marker emitted so far.
+        """
+        self.bus.flush()
+        if self.neo is not None:
+            self.neo.flush()
+
+    def save_latency(self, filename):
+        """
+        Write the enqueue and per-sink delivery histograms, plus NEO delivery
+        (enqueue to acknowledgement), with the drop/late counters of every sink.
+        """
+        self.flush()
+        histograms = {"enqueue": self.latency}
+        for sink in self.bus.sinks:
+            histograms.update(sink.histograms())
+        if self.neo is not None:
+            histograms["neo_delivery"] = self.neo.latency
+        return save_latency_report(histograms, filename, counters=self.bus.stats())
+
+    def close(self):
+        self.bus.close()
+
+    def lsl_time(self, t):
+        return self._device_time("lsl", t, self.lsl_offset)
+
+    def neo_time(self, t):
+        return self._device_time("neo", t, self.neo_offset)
+
+    def clock_times(self, t):
+        """
+        Return (LSL time, eye-tracker time) for a local time `t`; NaN if not connected.
+        """
+        lsl_time = self.lsl_time(t)
+        if self.pupil is not None:
+            return lsl_time, self.pupil.pupil_time(t)
+        if self.neo is not None:
+            return lsl_time, self.neo_time(t)
+        return lsl_time, float("nan")
+
+    def _device_time(self, name, t, offset):
+        if self.sync is not None and name in self.sync.models:
+            return self.sync.to_device(name, t)
+        return t + offset
+
+
+# ─────────────────────────────────────────────
+# STIMULUS CACHE
+# ─────────────────────────────────────────────
+
+class StimulusCache:
+    """
+    Decode and upload stimuli as ImageStim objects before the presentation loop.
+    Each unique file is loaded once and shared by all of its repeats.
+    If the set exceeds `budget_mb`, least recently used stimuli are evicted and a
+    background thread decodes the upcoming ones so only the GPU upload is left,
+    which `refill()` performs outside the stimulus interval.
+    `prepared` maps stimulus paths to arrays from `stimprep.prepare`, which are
+    memory-mapped instead of decoded. `stim_factory(win, image)` replaces
+    visual.ImageStim, e.g. for headless benchmarks.
+    """
+
+    def __init__(self, win, budget_mb=2048, lookahead=8, prepared=None, stim_factory=None):
+        self.win = win
+        self.prepared = prepared or {}
+        self.stim_factory = stim_factory or visual.ImageStim
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.lookahead = lookahead
+        self.used = 0
+        self.misses = 0
+        self.preload_time = 0.0
+        self._stims = OrderedDict()
+        self._decoded = {}
+        self._schedule = []
+        self._cursor = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def _decode(self, key):
+        if key in self.prepared:
+            return stimprep.load_prepared(self.prepared[key])
+        image = Image.open(key)
+        image.load()
+        return image
+
+    def _upload(self, key, image):
+        nbytes = image.width * image.height * 4
+        with self._cond:
+            while self._stims and self.used + nbytes > self.budget:
+                _, (_, old_bytes) = self._stims.popitem(last=False)
+                self.used -= old_bytes
+        stim = self.stim_factory(self.win, image=image)
+        with self._cond:
+            self._stims[key] = (stim, nbytes)
+            self.used += nbytes
+        return stim
+
+    def preload(self, paths):
+        """
+        Load unique stimuli in order of first appearance until the budget is full.
+        Returns the preload time in seconds.
+        """
+        start = time.perf_counter()
+        self._schedule = [str(p) for p in paths]
+        self._cursor = 0
+        unique = list(dict.fromkeys(self._schedule))
+        for key in unique:
+            if key in self._stims:
+                continue
+            image = self._decode(key)
+            if self._stims and self.used + image.width * image.height * 4 > self.budget:
+                break
+            self._upload(key, image)
+
+        self.preload_time = time.perf_counter() - start
+        print(f"🗂️  Preloaded {len(self._stims)}/{len(unique)} stimuli "
+              f"({self.used / 2**20:.0f} MB) in {self.preload_time:.2f} s")
+
+        if len(self._stims) < len(unique) and self._thread is None:
+            self._thread = threading.Thread(target=self._refill_loop, daemon=True)
+            self._thread.start()
+        return self.preload_time
+
+    def get(self, path):
+        """
+        Return the ImageStim for the next stimulus in the schedule.
+        """
+        key = str(path)
+        with self._cond:
+            self._cursor += 1
+            self._cond.notify()
+            entry = self._stims.get(key)
+            if entry is not None:
+                self._stims.move_to_end(key)
+                return entry[0]
+            image = self._decoded.pop(key, None)
+
+        self.misses += 1
+        return self._upload(key, image if image is not None else self._decode(key))
+
+    def refill(self, max_items=2):
+        """
+        Upload stimuli decoded in the background. Call during blank intervals.
+        """
+        for _ in range(max_items):
+            with self._cond:
+                if not self._decoded:
+                    return
+                key, image = self._decoded.popitem()
+            self._upload(key, image)
+
+    def _upcoming(self):
+        window = self._schedule[self._cursor:self._cursor + self.lookahead]
+        return [k for k in dict.fromkeys(window) if k not in self._stims and k not in self._decoded]
+
+    def _refill_loop(self):
+        while True:
+            with self._cond:
+                todo = self._upcoming()
+                while not self._closed and not todo:
+                    self._cond.wait()
+                    todo = self._upcoming()
+                if self._closed:
+                    return
+            for key in todo:
+                image = self._decode(key)
+                with self._cond:
+                    self._decoded[key] = image
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._stims.clear()
+        self._decoded.clear()
+
+
+# ─────────────────────────────────────────────
+# FRAME-COUNTED SCHEDULING
+# ─────────────────────────────────────────────
+
+def load_refresh_rate(config_path=None, win=None, default=60.0):
+    """
+    Resolve the display refresh rate in Hz.
+    Uses `display.flip_interval_override` or `monitor.refresh_rate_hz` from
+    display-conf.yml, then a measurement on `win`, then `default`.
+    """
+    if config_path is not None and Path(config_path).exists():
+        with open(config_path, "r", encoding="utf-8") as f:
+            conf = yaml.safe_load(f) or {}
+        override = float(conf.get("display", {}).get("flip_interval_override") or 0.0)
+        if override > 0:
+            return 1.0 / override
+        rate = conf.get("monitor", {}).get("refresh_rate_hz")
+        if rate:
+            return float(rate)
+
+    if win is not None:
+        measured = win.getActualFrameRate(nIdentical=20, nMaxFrames=240)
+        if measured:
+            return float(measured)
+    return default
+
+class FrameScheduler:
+    """
+    Present screens for a whole number of flips instead of sleeping.
+    Every phase logs the flips it planned and the flips actually delivered,
+    measured from the flip timestamps. With a FrameRecorder attached, every
+    flip time is also stored for the dropped-frame report.
+    """
+
+    def __init__(self, win, refresh_hz, recorder=None):
+        self.win = win
+        self.refresh_hz = float(refresh_hz)
+        self.frame_period = 1.0 / self.refresh_hz
+        self.recorder = recorder
+        self.log = []
+
+    def frames(self, seconds):
+        """
+        Convert a duration into a whole number of flips (at least one).
+        """
+        return max(1, int(round(seconds * self.refresh_hz)))
+
+    def present(self, phase, seconds, draw=None, on_onset=None, onset_args=()):
+        """
+        Flip `draw` for the number of frames matching `seconds`.
+        `on_onset(*onset_args)` runs right after the first flip. Returns the onset flip time.
+        """
+        return self.present_frames(phase, self.frames(seconds), draw, on_onset, onset_args)
+
+    def present_frames(self, phase, planned, draw=None, on_onset=None, onset_args=()):
+        """
+        Same as `present` with a precomputed number of flips.
+        """
+        onset = last = None
+        record = self.recorder.record if self.recorder is not None else None
+        for n in range(planned):
+            if draw is not None:
+                draw()
+            last = self.win.flip()
+            if record is not None:
+                record(last)
+            if n == 0:
+                onset = last
+                if on_onset is not None:
+                    on_onset(*onset_args)
+
+        delivered = int(round((last - onset) / self.frame_period)) + 1
+        self.log.append((phase, planned, delivered))
+        if delivered != planned:
+            print(f"⚠️  {phase}: planned {planned} flips, delivered {delivered}")
+        return onset
+
+    def save_log(self, filename):
+        """
+        Write the planned/delivered flips of every phase as CSV.
+        """
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write("phase,planned_flips,delivered_flips\n")
+            for phase, planned, delivered in self.log:
+                f.write(f"{phase},{planned},{delivered}\n")
+
+
+class FrameRecorder:
+    """
+    Store every flip time in preallocated NumPy buffers, tagged with the trial
+    index and phase set by `tag()`. Recording a flip is three array stores.
+    At the end, `save()` writes the raw buffers and a per-trial dropped-frame report.
+    """
+
+    PHASES = ("other", "stim", "blank")
+    STIM, BLANK = 1, 2
+
+    def __init__(self, capacity, frame_period):
+        self.frame_period = frame_period
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.trials = np.full(capacity, -1, dtype=np.int32)
+        self.phases = np.zeros(capacity, dtype=np.int8)
+        self.count = 0
+        self.overflow = 0
+        self._trial = -1
+        self._phase = 0
+
+    def tag(self, trial, phase=0):
+        """
+        Tag the following flips with a trial index and phase code.
+        """
+        self._trial = trial
+        self._phase = phase
+
+    def record(self, t):
+        n = self.count
+        if n == len(self.times):
+            self.overflow += 1
+            return
+        self.times[n] = t
+        self.trials[n] = self._trial
+        self.phases[n] = self._phase
+        self.count = n + 1
+
+    def summary(self):
+        """
+        Return (per-trial table, jitter summary). The interval after each flip
+        belongs to the phase of that flip; an interval of k periods drops k-1 frames.
+        """
+        n = self.count
+        intervals = np.diff(self.times[:n])
+        trials = self.trials[:n - 1]
+        phases = self.phases[:n - 1]
+        dropped = np.maximum(np.rint(intervals / self.frame_period) - 1, 0).astype(np.int64)
+
+        n_trials = int(trials.max()) + 1 if len(trials) and trials.max() >= 0 else 0
+        table = np.zeros(n_trials, dtype=[("trial", "i4"), ("stim_duration_s", "f8"),
+                                          ("stim_dropped", "i4"), ("blank_dropped", "i4")])
+        table["trial"] = np.arange(n_trials)
+        for code, column in ((self.STIM, "stim_dropped"), (self.BLANK, "blank_dropped")):
+            mask = (phases == code) & (trials >= 0)
+            table[column] = np.bincount(trials[mask], weights=dropped[mask], minlength=n_trials)
+            if code == self.STIM:
+                table["stim_duration_s"] = np.bincount(trials[mask], weights=intervals[mask], minlength=n_trials)
+
+        jitter_ms = (intervals - self.frame_period) * 1000.0
+        percentiles = np.percentile(jitter_ms, [50, 95, 99]) if len(jitter_ms) else [0.0, 0.0, 0.0]
+        stats = {
+            "flips": int(n),
+            "dropped_frames": int(dropped.sum()),
+            "frame_period_ms": self.frame_period * 1000.0,
+            "jitter_p50_ms": float(percentiles[0]),
+            "jitter_p95_ms": float(percentiles[1]),
+            "jitter_p99_ms": float(percentiles[2]),
+            "jitter_max_ms": float(jitter_ms.max()) if len(jitter_ms) else 0.0,
+            "buffer_overflow": self.overflow
+        }
+        return table, stats
+
+    def save(self, output_dir, suffix=""):
+        """
+        Write frame_intervals.npz (raw flips), frame_report.csv (per trial)
+        and frame_summary.json (jitter percentiles) to `output_dir`, with
+        `suffix` added to each file name (e.g. for a resumed segment).
+        """
+        output_dir = Path(output_dir)
+        n = self.count
+        np.savez(output_dir / f"frame_intervals{suffix}.npz", times=self.times[:n],
+                 trials=self.trials[:n], phases=self.phases[:n], frame_period=self.frame_period)
+        table, stats = self.summary()
+        np.savetxt(output_dir / f"frame_report{suffix}.csv", table, delimiter=",", fmt=["%d", "%.6f", "%d", "%d"],
+                   header=",".join(table.dtype.names), comments="")
+        with open(output_dir / f"frame_summary{suffix}.json", 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+
+        print(f"🎞️  {stats['flips']} flips, {stats['dropped_frames']} dropped; jitter p50/p95/p99/max = "
+              f"{stats['jitter_p50_ms']:.2f}/{stats['jitter_p95_ms']:.2f}/"
+              f"{stats['jitter_p99_ms']:.2f}/{stats['jitter_max_ms']:.2f} ms")
+        return stats
+
+
+# ─────────────────────────────────────────────
+# SCREENSHOT WRITER
+# ─────────────────────────────────────────────
+
+class ScreenshotWriter:
+    """
+    Grab screenshots on the render thread and encode them on a bounded worker pool.
+    `capture` only copies the frame; it blocks when `max_pending` frames are queued.
+    Frames with identical content are encoded once and copied for later repeats.
+    """
+
+    def __init__(self, workers=2, max_pending=8):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screenshot")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._written = {}
+        self.saved = 0
+        self.deduplicated = 0
+
+    def capture(self, win, filename, buffer='front'):
+        """
+        Copy the current frame and queue it to be written to `filename`.
+        """
+        frame = win.getMovieFrame(buffer=buffer)
+        win.movieFrames.clear()
+        self._slots.acquire()
+        future = self._pool.submit(self._write, frame, str(filename))
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self._slots.release()
+        if future.exception() is not None:
+            print(f"[SCREENSHOT ERROR] {future.exception()}")
+
+    def _write(self, frame, filename):
+        digest = hashlib.blake2b(frame.tobytes(), digest_size=16).digest()
+        with self._lock:
+            first = self._written.get(digest)
+            if first is None:
+                entry = self._written[digest] = (filename, threading.Event())
+
+        if first is None:
+            try:
+                frame.save(filename)
+            except BaseException:
+                # Later repeats must not copy a file that was never written
+                with self._lock:
+                    del self._written[digest]
+                raise
+            finally:
+                entry[1].set()
+            with self._lock:
+                self.saved += 1
+        else:
+            source, ready = first
+            ready.wait()
+            with self._lock:
+                encoded = self._written.get(digest) is first
+            if not encoded:
+                # The first copy failed: encode this one instead
+                return self._write(frame, filename)
+            shutil.copyfile(source, filename)
+            with self._lock:
+                self.deduplicated += 1
+
+    def close(self):
+        """
+        Wait until every queued screenshot has been written.
+        """
+        self._pool.shutdown(wait=True)
+        print(f"📸 Screenshots: {self.saved} encoded, {self.deduplicated} copied from repeats")
+
 
 # ─────────────────────────────────────────────
 # FRAME RATE VALIDATION
@@ -0,0 +1,95 @@
+# experiments/devicecache.py
+
+"""
+Device Address Cache for XTIM
+Remembers the last NEO that was reached (address, port, serial) in the user
+cache ~/.xtim/devices.json. The cached address is probed with one short HTTP
+request before falling back to mDNS discovery, which is slow and unreliable
+on Wi-Fi.
+"""
+
+import json
+import time
+from pathlib import Path
+import requests
+
+USER_DIR = Path.home() / ".xtim"
+CACHE_FILE = USER_DIR / "devices.json"
+
+
+def load():
+    """
+    Return the cache as {kind: {"address", "port", "serial", "seen"}}.
+    """
+    if not CACHE_FILE.exists():
+        return {}
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def remember(kind, address, port, serial=None):
+    cache = load()
+    cache[kind] = {"address": address, "port": port, "serial": serial, "seen": time.time()}
+    USER_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_FILE.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    tmp.replace(CACHE_FILE)
+
+def forget(kind=None):
+    """
+    Drop one entry, or the whole cache. Returns the number of entries removed.
+    """
+    cache = load()
+    if kind is None:
+        removed = len(cache)
+        cache = {}
+    else:
+        removed = 1 if cache.pop(kind, None) is not None else 0
+    if CACHE_FILE.exists():
+        if cache:
+            with open(CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump(cache, f, indent=2)
+        else:
+            CACHE_FILE.unlink()
+    return removed
+
+def probe_neo(address, port, timeout=1.0):
+    """
+    Ask the NEO Companion API for its status. Returns the phone's device id,
+    or None when nothing answers within `timeout` seconds.
+    """
+    try:
+        response = requests.get(f"http://{address}:{port}/api/status", timeout=timeout)
+        response.raise_for_status()
+        for component in response.json().get("result", []):
+            if component.get("model") == "Phone":
+                return component["data"].get("device_id") or ""
+        return ""
+    except (requests.RequestException, ValueError, KeyError):
+        return None
+
+def find_neo(probe_timeout=1.0, discovery_timeout=10.0):
+    """
+    Return (address, port) of a reachable NEO: the cached one if it answers
+    the probe, otherwise the first device found by discovery (then cached).
+    """
+    cached = load().get("neo")
+    if cached:
+        serial = probe_neo(cached["address"], cached["port"], timeout=probe_timeout)
+        if serial is not None and (not cached.get("serial") or serial == cached["serial"]):
+            print(f"📡 NEO at cached address {cached['address']}:{cached['port']}")
+            return cached["address"], cached["port"]
+        print(f"🔎 Cached NEO {cached['address']}:{cached['port']} not reachable, discovering...")
+
+    from pupil_labs.realtime_api.simple import discover_one_device
+
+    found = discover_one_device(max_search_duration_seconds=discovery_timeout)
+    if found is None:
+        raise SystemExit("❌ No NEO found on the network")
+    address, port = found.address, found.port
+    found.close()
+    remember("neo", address, port, probe_neo(address, port, timeout=probe_timeout) or None)
+    return address, port
@@ -0,0 +1,710 @@
+# experiments/engine.py
+
+"""
+XTIM Trial-Timeline Engine
+Shared runner for the official protocols (core-screen, neo-screen, core-asset,
+neo-asset). A protocol spec is compiled into a flat, precomputed trial table,
+which a single loop executes against a pluggable device backend (Pupil Core,
+Pupil NEO or none).
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, TimeoutError
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+import yaml
+from pylsl import StreamInfo, StreamOutlet, local_clock
+from experiments import commons as cm
+from experiments import clocksync, devicecache, stimprep
+from experiments.latency import LATENCY_NAME
+from experiments.protocols import DEFAULT_CONFIG, PROTOCOLS
+from experiments.sessionlog import SessionLog, LOG_NAME, load_session_log
+
+# ─────────────────────────────────────────────
+# PROTOCOL SPECS
+# ─────────────────────────────────────────────
+
+# One row of the trial table. `end_marker` is emitted at the onset of the
+# blank phase (screen) or when the stimulation ends (asset).
+Trial = namedtuple("Trial", "index stimulus name marker end_marker screenshot")
+
+
+class Protocol:
+    """
+    A protocol spec compiled for one experiment folder: configuration, output
+    paths and the trial table, all resolved before the session starts.
+    The shuffled schedule is saved to __output__/schedule.json; with `resume`
+    it is reloaded from there and the trials already completed according to
+    the session log are skipped (`pending` holds the rest), and the timing
+    reports of the resumed segment get a `_resume<n>` suffix (`report_file`).
+    `output_dir` replaces __output__, e.g. one folder per participant and block;
+    asset protocols then write their order there instead of into assets.txt.
+    `end_marker` is the label that closes the session ("END", or the label the
+    protocol's original script used, e.g. "end_of_experiment" for core-asset).
+    With `sync.method: ttl` in display-conf.yml, `triggers` maps every marker
+    to its one-byte TTL code (see `ttl.compile_codes`).
+    """
+
+    def __init__(self, name, target, config=None, device=None, resume=False, output_dir=None):
+        if name not in PROTOCOLS:
+            raise ValueError(f"Unknown protocol '{name}'. Available: {', '.join(PROTOCOLS)}")
+        self.name = name
+        self.spec = PROTOCOLS[name]
+        self.mode = self.spec["mode"]
+        self.device = device or self.spec["device"]
+        self.target = Path(target)
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self.resumed = resume
+        self.end_marker = self.spec.get("end_marker", "END")
+
+        self.output_dir = Path(output_dir) if output_dir else self.target / "__output__"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.display_conf = self.target / "config" / "display-conf.yml"
+        self.schedule_file = self.output_dir / "schedule.json"
+        if self.mode == "screen":
+            self.order_file = self.output_dir / "order.txt"
+        else:
+            self.order_file = (self.output_dir if output_dir else self.target) / "assets.txt"
+
+        if resume:
+            entries = self._load_schedule()
+        else:
+            entries = self._screen_entries() if self.mode == "screen" else self._asset_entries()
+            self._save_schedule(entries)
+            # The log of an earlier schedule must not count towards a later resume
+            stale_log = self.output_dir / LOG_NAME
+            if stale_log.exists():
+                stale_log.unlink()
+        self.trials = [self._make_trial(i, entry) for i, entry in enumerate(entries)]
+        self.completed = self._count_completed() if resume else 0
+        # Each resumed segment writes its own timing reports next to the earlier ones
+        self.segment = self._count_resumes() + 1 if resume else 0
+        self.report_suffix = f"_resume{self.segment}" if self.segment else ""
+        self.pending = self.trials[self.completed:]
+        self.ttl = None
+        self.triggers = None
+        self._compile_triggers()
+
+    def _screen_entries(self):
+        obj_dir = self.target / "OBJECTS"
+        source = obj_dir / "pseudorandom" if self.config["shuffle"] else obj_dir
+        stimuli = sorted(source.glob(self.spec["pattern"])) * self.config["n_repeats"]
+        if self.config["shuffle"]:
+            np.random.shuffle(stimuli)
+        return [img.relative_to(self.target).as_posix() for img in stimuli]
+
+    def _asset_entries(self):
+        assets_file = self.target / "assets.txt"
+        if not assets_file.exists():
+            raise SystemExit(f"❌ File not found: {assets_file}")
+        with open(assets_file, "r", encoding="utf-8") as f:
+            assets = [line.strip() for line in f if line.strip()]
+        random.shuffle(assets)
+        return assets
+
+    def _compile_triggers(self):
+        # With `sync.method: ttl` every marker gets its one-byte trigger here
+        sync = {}
+        if self.display_conf.exists():
+            with open(self.display_conf, "r", encoding="utf-8") as f:
+                sync = (yaml.safe_load(f) or {}).get("sync") or {}
+        if sync.get("method") != "ttl":
+            return
+        from experiments import ttl
+
+        self.ttl = ttl.ttl_config(sync)
+        self.triggers, table = ttl.compile_codes(self.trials, self.mode, self.ttl["codes"], self.end_marker)
+        ttl.save_codes(table, self.output_dir / ttl.CODES_NAME)
+
+    def _make_trial(self, i, entry):
+        if self.mode == "asset":
+            return Trial(i, entry, entry, entry, "end_of_stimulation", None)
+        img = self.target / entry
+        return Trial(i, str(img), img.name, f"stim_{i}", f"blank_{i}", str(self.output_dir / f"{i:03d}_{img.name}"))
+
+    def _save_schedule(self, entries):
+        with open(self.schedule_file, "w", encoding="utf-8") as f:
+            json.dump({"protocol": self.name, "config": self.config, "trials": entries}, f, indent=1)
+
+    def _load_schedule(self):
+        if not self.schedule_file.exists():
+            raise SystemExit(f"❌ Nothing to resume: {self.schedule_file} not found")
+        with open(self.schedule_file, "r", encoding="utf-8") as f:
+            schedule = json.load(f)
+        if schedule["protocol"] != self.name:
+            raise SystemExit(f"❌ Session in {self.output_dir} was started with '{schedule['protocol']}', not '{self.name}'")
+        self.config = {**DEFAULT_CONFIG, **schedule["config"]}
+        return schedule["trials"]
+
+    def report_file(self, filename):
+        """
+        `filename` with this segment's `report_suffix` (frame, latency and
+        clock reports are per segment; logs and markers.tsv are appended).
+        """
+        path = Path(filename)
+        return path.with_name(f"{path.stem}{self.report_suffix}{path.suffix}")
+
+    def _count_resumes(self):
+        log_file = self.output_dir / LOG_NAME
+        if not log_file.exists():
+            return 0
+        return int(np.count_nonzero(load_session_log(log_file)["event"] == b"RESUME"))
+
+    def _count_completed(self):
+        # Completed = the leading trials of this schedule that have a "done"
+        # record for the same stimulus, so records of other schedules never count.
+        log_file = self.output_dir / LOG_NAME
+        if not log_file.exists():
+            return 0
+        log = load_session_log(log_file)
+        done_event = b"stim" if self.mode == "screen" else b"end_of_stimulation"
+        done = log[log["event"] == done_event]
+        logged = set(zip(done["trial"].tolist(), done["stimulus"].tolist()))
+        completed = 0
+        for trial in self.trials:
+            if (trial.index, trial.name.encode("utf-8")[:96]) not in logged:
+                break
+            completed += 1
+        return completed
+
+
+# ─────────────────────────────────────────────
+# DEVICE BACKENDS
+# ─────────────────────────────────────────────
+
+class NullBackend:
+    """
+    No eye tracker: markers go to LSL only.
+    `connect_timeout` bounds the time `connect` may take at session startup.
+    """
+    name = "none"
+    sync_options = {}
+    connect_timeout = 5.0
+
+    def __init__(self):
+        self.pupil = None
+        self.neo = None
+
+    def connect(self, sync):
+        pass
+
+    def outlet(self, stream):
+        # None: the session creates its own StreamOutlet
+        return None
+
+    def start_recording(self):
+        pass
+
+    def stop_recording(self):
+        return None
+
+    def close(self):
+        pass
+
+class CoreBackend(NullBackend):
+    """
+    Pupil Core through Pupil Remote (annotations published on the IPC backbone).
+    """
+    name = "core"
+
+    def __init__(self, ip="127.0.0.1", port=50020):
+        super().__init__()
+        self.ip = ip
+        self.port = port
+
+    def connect(self, sync):
+        if self.pupil is None:
+            self.pupil = cm.PupilRemote(self.ip, self.port, sync=sync)
+        else:
+            self.pupil.attach(sync)
+
+    def start_recording(self):
+        self.pupil.command("R")
+
+    def stop_recording(self):
+        self.pupil.command("r")
+        return None
+
+    def close(self):
+        if self.pupil is not None:
+            self.pupil.close()
+
+class NeoBackend(NullBackend):
+    """
+    Pupil NEO through the asynchronous realtime API dispatcher. Without an
+    address the cached one is probed first, then mDNS discovery runs
+    (see `devicecache.find_neo`).
+    """
+    name = "neo"
+    sync_options = {"interval": 10.0, "probes_per_round": 1, "initial_probes": 3}
+    connect_timeout = 20.0
+
+    def __init__(self, address=None, port=8080):
+        super().__init__()
+        self.address = address
+        self.port = port
+
+    def connect(self, sync):
+        from experiments.neo import NeoDispatcher
+
+        if self.address is None:
+            self.address, self.port = devicecache.find_neo()
+        if self.neo is None:
+            self.neo = NeoDispatcher(self.address, self.port)
+        sync.add("neo", clocksync.neo_probe(self.neo), timed=True)
+
+    def start_recording(self):
+        self.neo.recording_start()
+
+    def stop_recording(self):
+        self.neo.flush()
+        return self.neo.recording_stop_and_save()
+
+    def close(self):
+        if self.neo is not None:
+            self.neo.close()
+
+class BrokerBackend(NullBackend):
+    """
+    Core or NEO through a running device broker (experiments/broker.py), which
+    also owns the LSL outlet: warm connections, no discovery at startup.
+    """
+    name = "broker"
+
+    def __init__(self, device, endpoint=None, ip="127.0.0.1", port=50020, neo_address=None):
+        from experiments import broker
+
+        super().__init__()
+        self.device = device
+        self.sync_options = NeoBackend.sync_options if device == "neo" else {}
+        self.connect_timeout = BACKENDS[device].connect_timeout
+        self.client = broker.BrokerClient(endpoint or broker.DEFAULT_ENDPOINT)
+        self.ip = ip
+        self.port = port
+        self.neo_address = neo_address
+
+    def connect(self, sync):
+        from experiments import broker
+
+        if self.device == "core":
+            if self.pupil is None:
+                self.pupil = broker.BrokerPupil(self.client, self.ip, self.port)
+            self.pupil.attach(sync)
+        elif self.device == "neo":
+            if self.neo is None:
+                self.neo = broker.BrokerNeo(self.client, self.neo_address)
+            sync.add("neo", clocksync.neo_probe(self.neo), timed=True)
+
+    def outlet(self, stream):
+        from experiments import broker
+
+        return broker.BrokerOutlet(self.client, stream)
+
+    def start_recording(self):
+        if self.device == "core":
+            self.pupil.command("R")
+        elif self.device == "neo":
+            self.neo.recording_start()
+
+    def stop_recording(self):
+        if self.device == "core":
+            self.pupil.command("r")
+        elif self.device == "neo":
+            self.neo.flush()
+            return self.neo.recording_stop_and_save()
+        return None
+
+    def close(self):
+        self.client.close()
+
+BACKENDS = {"core": CoreBackend, "neo": NeoBackend, "none": NullBackend}
+
+
+# ─────────────────────────────────────────────
+# SESSION
+# ─────────────────────────────────────────────
+
+class Session:
+    """
+    Set up devices, window and stimuli for a compiled Protocol and run its trial table.
+    A window, LSL outlet or stimulus cache passed in, and the backend when
+    `keep_backend` is set, are left open by `close()` so a resident process or a
+    batch can reuse them across sessions. `timings` holds setup and stimulus
+    seconds once the session has run, and per-component startup seconds.
+    """
+
+    def __init__(self, protocol, backend=None, win=None, keep_backend=False, outlet=None, cache=None):
+        self.protocol = protocol
+        self.config = protocol.config
+        self.backend = backend or BACKENDS[protocol.device]()
+        self.keep_backend = keep_backend
+        self.sync = None
+        self.log = None
+        self.markers = None
+        self.win = win
+        self.owns_win = win is None
+        self.lsl_out = outlet
+        self.cache = cache
+        self.owns_cache = cache is None
+        self.timings = {}
+        self.startup = {}
+        self.order = [trial.name for trial in protocol.trials[:protocol.completed]]
+
+    # Setup ────────────────────────────────────
+
+    def setup(self):
+        # Device connection with its initial clock sync and the LSL outlet run
+        # in background threads while the window opens and stimuli preload
+        # here (OpenGL needs the main thread).
+        start = time.perf_counter()
+        self.log = SessionLog(self.protocol.output_dir / LOG_NAME, resume=self.protocol.resumed)
+        print("🔌 Initializing communication...")
+        self.sync = clocksync.ClockSync(**self.backend.sync_options)
+        self.sync.add("lsl", local_clock)
+
+        device_timeout = self.config.get("device_timeout") or self.backend.connect_timeout
+        waiting = [(f"device ({self.backend.name})",
+                    self._background(f"device ({self.backend.name})", self._connect_device),
+                    device_timeout)]
+        if self.lsl_out is None:
+            waiting.append(("lsl outlet", self._background("lsl outlet", self._make_outlet), 5.0))
+        if self.protocol.triggers is not None:
+            waiting.append(("ttl port", self._background("ttl port", self._open_ttl), 5.0))
+
+        if self.protocol.mode == "screen":
+            self._setup_screen()
+
+        sinks = []
+        for name, future, timeout in waiting:
+            try:
+                result = future.result(timeout=max(0.0, start + timeout - time.perf_counter()))
+            except TimeoutError:
+                raise SystemExit(f"❌ {name} not ready after {timeout:.0f} s")
+            if name == "lsl outlet":
+                self.lsl_out = result
+            elif name == "ttl port":
+                sinks.append(result)
+
+        self.markers = cm.FlipMarkers(self.win, lsl_outlet=self.lsl_out, pupil=self.backend.pupil,
+                                      neo=self.backend.neo, sync=self.sync,
+                                      filename=self.protocol.output_dir / cm.MARKERS_NAME, sinks=sinks,
+                                      resume=self.protocol.resumed, end_marker=self.protocol.end_marker)
+        self.startup["ready"] = time.perf_counter() - start
+        self._startup_report()
+
+    def _connect_device(self):
+        # The initial clock-sync probes (a full time-echo estimate for NEO) run
+        # right after the connection on the same background thread, so they
+        # overlap the window and the stimulus preload too
+        self.backend.connect(self.sync)
+        with self._timed("clock sync"):
+            self.sync.start()
+
+    def _open_ttl(self):
+        from experiments import ttl
+
+        conf = self.protocol.ttl
+        connection = ttl.open_port(conf["port"], conf["baudrate"])
+        print(f"⚡ TTL triggers on {conf['port']} ({conf['pulse_ms']:.0f} ms pulses)")
+        return ttl.TTLSink(connection, self.protocol.triggers, pulse_ms=conf["pulse_ms"])
+
+    def _background(self, component, function, *args):
+        """
+        Run `function` in a daemon thread (a hung device never blocks exit).
+        Returns a Future; the duration goes into `startup[component]`.
+        """
+        future = Future()
+
+        def work():
+            try:
+                with self._timed(component):
+                    future.set_result(function(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=work, name=f"setup-{component}", daemon=True).start()
+        return future
+
+    @contextmanager
+    def _timed(self, component):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup[component] = time.perf_counter() - start
+
+    def _startup_report(self):
+        print(f"🚦 Ready in {self.startup['ready']:.2f} s")
+        for component, seconds in self.startup.items():
+            if component != "ready":
+                print(f"   {component:<20} {seconds:6.2f} s")
+        self.timings["startup"] = dict(self.startup)
+
+    def _make_outlet(self):
+        outlet = self.backend.outlet(self.protocol.spec["stream"])
+        if outlet is not None:
+            return outlet
+        stream_name, stream_type, source_id = self.protocol.spec["stream"]
+        return StreamOutlet(StreamInfo(stream_name, stream_type, 1, 0, "string", source_id))
+
+    def _setup_screen(self):
+        from psychopy import visual
+
+        cfg = self.config
+        if self.win is None:
+            print("🖥️  Opening PsychoPy window...")
+            with self._timed("window"):
+                self.win = open_window(cfg)
+        self.drift_dot = visual.Circle(self.win, radius=10, fillColor=cfg["drift_color"], lineColor=cfg["drift_color"])
+        self.text = visual.TextStim(self.win, text="Press any key to start", height=cfg["text_size"], color="black")
+
+        refresh_hz = cm.load_refresh_rate(self.protocol.display_conf, win=self.win)
+        self.scheduler = cm.FrameScheduler(self.win, refresh_hz)
+        self.scheduler.recorder = cm.FrameRecorder(self._frame_capacity(), self.scheduler.frame_period)
+        print(f"🖥️  Refresh rate: {refresh_hz:.2f} Hz")
+
+        script_img_dir = self.protocol.target / "script-images"
+        welcome_img_path = next(script_img_dir.glob("welcome.*"), None)
+        goodbye_img_path = next(script_img_dir.glob("goodbye.*"), None)
+        self.welcome_image = visual.ImageStim(self.win, image=str(welcome_img_path)) if welcome_img_path else None
+        self.goodbye_image = visual.ImageStim(self.win, image=str(goodbye_img_path)) if goodbye_img_path else None
+
+        # Decode and upload every unique stimulus before START
+        prepared = stimprep.load_manifest(self.protocol.target)
+        if self.cache is None:
+            self.cache = cm.StimulusCache(self.win, budget_mb=cfg["cache_budget_mb"], prepared=prepared)
+        else:
+            self.cache.prepared.update(prepared)
+        with self._timed("stimulus preload"):
+            self.cache.preload(trial.stimulus for trial in self.protocol.pending)
+        self.screenshots = cm.ScreenshotWriter()
+
+    def _frame_capacity(self):
+        # Planned flips for the whole session, with headroom for dropped frames
+        cfg = self.config
+        frames = self.scheduler.frames
+        per_trial = frames(cfg["stim_time"]) + frames(cfg["blank_time"])
+        fixed = frames(cfg["welcome_duration"]) + frames(cfg["drift_time"]) + frames(cfg["goodbye_duration"])
+        return int((len(self.protocol.pending) * per_trial + fixed) * 1.25) + 1024
+
+    # Run ──────────────────────────────────────
+
+    def run(self):
+        try:
+            start = time.perf_counter()
+            self.setup()
+            self.timings["setup"] = time.perf_counter() - start
+            if self.protocol.mode == "screen":
+                self._run_screen()
+            else:
+                self._run_asset()
+        finally:
+            self.close()
+
+    def _run_screen(self):
+        from psychopy import event
+
+        cfg = self.config
+        if self.welcome_image:
+            self.scheduler.present("welcome", cfg["welcome_duration"], draw=self.welcome_image.draw)
+        else:
+            self.text.draw()
+            self.win.flip()
+        event.waitKeys()
+
+        self.markers.on_flip("DRIFT")
+        self.scheduler.present("drift", cfg["drift_time"], draw=self.drift_dot.draw)
+        self._log(-1, "DRIFT", "", self.markers.last_time)
+
+        self._start()
+        print(f"🎞️  Presenting {len(self.protocol.pending)} of {len(self.protocol.trials)} images...")
+        self._screen_loop()
+        self._log(-1, self.protocol.end_marker, "", self.markers.emit(self.protocol.end_marker))
+        self.screenshots.close()
+        self._finish()
+
+        if self.goodbye_image:
+            self.scheduler.present("goodbye", cfg["goodbye_duration"], draw=self.goodbye_image.draw)
+
+    def _screen_loop(self):
+        # Everything the loop touches is bound locally and every per-trial value
+        # comes precomputed from the trial table.
+        win = self.win
+        present = self.scheduler.present_frames
+        n_stim = self.scheduler.frames(self.config["stim_time"])
+        n_blank = self.scheduler.frames(self.config["blank_time"])
+        get = self.cache.get
+        refill = self.cache.refill
+        capture = self.screenshots.capture
+        on_flip = self.markers.on_flip
+        tag = self.scheduler.recorder.tag
+        STIM, BLANK = cm.FrameRecorder.STIM, cm.FrameRecorder.BLANK
+        phases = self.scheduler.log
+        markers = self.markers
+        log = self._log
+        order = self.order
+
+        for trial in self.protocol.pending:
+            stim = get(trial.stimulus)
+            on_flip(trial.marker)
+            tag(trial.index, STIM)
+            present(trial.marker, n_stim, stim.draw, capture, (win, trial.screenshot))
+            stim_time = markers.last_time
+            order.append(trial.name)
+            on_flip(trial.end_marker)
+            tag(trial.index, BLANK)
+            present(trial.end_marker, n_blank, None, refill)
+
+            (_, stim_planned, stim_delivered), (_, blank_planned, blank_delivered) = phases[-2:]
+            log(trial.index, "stim", trial.name, stim_time,
+                stim_delivered - stim_planned + blank_delivered - blank_planned)
+        tag(-1)
+
+    def _run_asset(self):
+        import keyboard
+
+        total = len(self.protocol.trials)
+        duration = self.config["stimulus_duration"]
+        print(f"📦 {len(self.protocol.pending)} of {total} assets pending.")
+        _confirm('🧪 Type "start" to begin the experiment: ', "start")
+        print("▶ Starting stimulation...")
+        time.sleep(2)
+
+        self._start()
+        for trial in self.protocol.pending:
+            print(f"[{trial.index + 1}/{total}] Present asset: {trial.name} and press ENTER to start stimulation.")
+            while keyboard.read_key() != "enter":
+                print("⌛ Waiting for ENTER... Press CTRL+C to cancel.")
+
+            cm.tic()
+            print(f"📍 Recording asset: {trial.name}")
+            self._log(trial.index, "stim", trial.name, self.markers.emit(trial.marker))
+            time.sleep(duration)
+            self._log(trial.index, trial.end_marker, trial.name, self.markers.emit(trial.end_marker))
+            self.order.append(trial.name)
+            cm.toc()
+
+        self._log(-1, self.protocol.end_marker, "", self.markers.emit(self.protocol.end_marker))
+        if self.protocol.spec.get("confirm_end"):
+            _confirm('🧪 Type "f" to finish the experiment: ', "f")
+            print("🛑 Ending experiment...")
+        self._finish()
+
+    def _start(self):
+        if self.protocol.spec["record"]:
+            self.backend.start_recording()
+        marker = "RESUME" if self.protocol.resumed else "START"
+        if self.protocol.resumed:
+            print(f"⏩ Resuming after trial {self.protocol.completed} of {len(self.protocol.trials)}")
+        self._log(-1, marker, "", self.markers.emit(marker))
+        cm.tic("stimuli")
+
+    def _log(self, trial, event, stimulus, t, dropped=0):
+        lsl_time, pupil_time = self.markers.clock_times(t)
+        self.log.append(trial, event, stimulus, t, lsl_time, pupil_time, dropped)
+
+    def _finish(self):
+        duration = cm.toc("stimuli")
+        self.timings["stimuli"] = duration
+        recording_id = self.backend.stop_recording() if self.protocol.spec["record"] else None
+
+        cm.save_list_to_txt(self.order, self.protocol.order_file)
+        self.markers.save_latency(self.protocol.report_file(self.protocol.order_file.parent / LATENCY_NAME))
+        if self.protocol.mode == "screen":
+            self.scheduler.save_log(self.protocol.report_file(self.protocol.output_dir / "frames.csv"))
+            self.scheduler.recorder.save(self.protocol.output_dir, self.protocol.report_suffix)
+        print(f"📝 Order saved to {self.protocol.order_file}")
+        print(f"✅ Experiment completed in {duration:.2f} seconds.")
+        if recording_id is not None:
+            print(f"🛑 Recording saved. ID: {recording_id}")
+
+    def close(self):
+        if self.markers is not None:
+            self.markers.close()
+        if self.sync is not None:
+            self.sync.stop()
+            if self.sync.models:
+                self.sync.save(self.protocol.report_file(self.protocol.output_dir / "clock_model.json"))
+        if not self.keep_backend:
+            self.backend.close()
+        if self.log is not None:
+            self.log.close()
+        if self.cache is not None and self.owns_cache:
+            self.cache.close()
+        if self.win is not None and self.owns_win:
+            self.win.close()
+
+def open_window(config=None):
+    """
+    Open the full-screen presentation window used by the screen protocols.
+    """
+    from psychopy import visual
+
+    cfg = {**DEFAULT_CONFIG, **(config or {})}
+    return visual.Window(
+        fullscr=True,
+        screen=cfg["screen_index"],
+        color=(127, 127, 127),
+        colorSpace="rgb255",
+        monitor="testMonitor",
+        units="pix",
+        allowGUI=False
+    )
+
+def _confirm(prompt, word):
+    while True:
+        if input(prompt).lower() == word:
+            return
+        print("⚠️  Invalid input. Press CTRL+C to cancel.")
+
+
+# ─────────────────────────────────────────────
+# ENTRY POINTS
+# ─────────────────────────────────────────────
+
+def run(name, target, config=None, device=None, resume=False, neo_address=None, use_broker=True):
+    """
+    Compile and run protocol `name` on an experiment folder.
+    `neo_address` ("host:port") skips NEO discovery, e.g. for `xtim devices simulate`.
+    With `use_broker`, a running device broker is used for Core/NEO and LSL.
+    """
+    from experiments import broker
+
+    protocol = Protocol(name, target, config=config, device=device, resume=resume)
+    backend = None
+    if use_broker and protocol.device in ("core", "neo") and broker.available():
+        print("🔌 Using the running device broker")
+        backend = BrokerBackend(protocol.device, neo_address=neo_address)
+    elif neo_address and protocol.device == "neo":
+        host, _, port = neo_address.partition(":")
+        backend = NeoBackend(host, int(port or 8080))
+    Session(protocol, backend=backend).run()
+
+def main(name, description=None):
+    """
+    Command-line entry point shared by the protocol scripts.
+    """
+    parser = argparse.ArgumentParser(description=description or f"Run XTIM {name} stimulation protocol.")
+    parser.add_argument("path", type=str, help="Path to the experiment folder (LABORATORY/<name>)")
+    parser.add_argument("--device", choices=list(BACKENDS), default=None,
+                        help="Override the device backend (e.g. 'none' for a dry run)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the session in __output__ from its last completed trial")
+    parser.add_argument("--neo-address", default=None,
+                        help="Connect to the NEO at host[:port] instead of discovering it")
+    parser.add_argument("--no-broker", action="store_true",
+                        help="Connect devices directly even if a device broker is running")
+    args = parser.parse_args()
+
+    target = Path(args.path)
+    if not target.exists():
+        print(f"❌ Path not found: {target}")
+        raise SystemExit(1)
+    run(name, target, device=args.device, resume=args.resume, neo_address=args.neo_address,
+        use_broker=not args.no_broker)
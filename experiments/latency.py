@@ -0,0 +1,131 @@
+# experiments/latency.py
+
+"""
+Marker Latency Histograms for XTIM Experiments
+HDR-style histograms of marker dispatch times in nanoseconds: log-linear
+buckets keep the relative error under 1% from 1 ns to a minute in a few
+thousand counters, so recording costs a couple of integer operations and
+histograms from different sessions or rigs can be merged bucket by bucket.
+"""
+
+import json
+import platform
+import sys
+from pathlib import Path
+import numpy as np
+
+LATENCY_NAME = "marker_latency.json"
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram: values below 2**sub_bits are counted exactly, above
+    that every power of two is split into 2**(sub_bits - 1) equal buckets.
+    Values above `max_ns` are clamped into the last bucket (`max` stays exact).
+    """
+
+    def __init__(self, sub_bits=8, max_ns=60_000_000_000):
+        self.sub_bits = sub_bits
+        self._sub = 1 << sub_bits
+        self._half = 1 << (sub_bits - 1)
+        self._max_index = self._index(max_ns)
+        self.counts = np.zeros(self._max_index + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def _index(self, value):
+        if value < self._sub:
+            return value
+        shift = value.bit_length() - self.sub_bits
+        return self._sub + (shift - 1) * self._half + (value >> shift) - self._half
+
+    def _highest(self, index):
+        # Largest value that falls into bucket `index`
+        if index < self._sub:
+            return index
+        shift, offset = divmod(index - self._sub, self._half)
+        shift += 1
+        return ((self._half + offset + 1) << shift) - 1
+
+    def record(self, value_ns):
+        value_ns = max(0, int(value_ns))
+        self.counts[min(self._index(value_ns), self._max_index)] += 1
+        self.count += 1
+        self.total += value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """
+        Value (ns) at or below which `p` percent of the recordings fall.
+        """
+        if not self.count:
+            return float("nan")
+        rank = max(1, int(np.ceil(p / 100 * self.count)))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(self._highest(index), self.max)
+
+    def summary(self):
+        """
+        Count plus mean/p50/p95/p99/max in microseconds.
+        """
+        us = lambda ns: round(ns / 1000, 3)
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_us": us(self.total / self.count),
+            "p50_us": us(self.percentile(50)),
+            "p95_us": us(self.percentile(95)),
+            "p99_us": us(self.percentile(99)),
+            "max_us": us(self.max)
+        }
+
+    def as_dict(self):
+        nonzero = np.flatnonzero(self.counts)
+        return {
+            "sub_bits": self.sub_bits,
+            "buckets": [[self._highest(int(i)), int(self.counts[i])] for i in nonzero],
+            **self.summary()
+        }
+
+
+def save_latency_report(histograms, filename, counters=None):
+    """
+    Write {sink: histogram} as JSON (summary plus raw buckets, with host and
+    software versions) and print one line per sink. `counters` ({sink: {name:
+    count}}, e.g. dropped markers) is stored alongside; nonzero drops are printed.
+    """
+    report = {
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": sys.version.split()[0],
+        "sinks": {name: hist.as_dict() for name, hist in histograms.items() if hist.count}
+    }
+    if counters:
+        report["counters"] = counters
+    try:
+        import psychopy
+        report["psychopy"] = psychopy.__version__
+    except ImportError:
+        pass
+
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+
+    print(f"⏱️  Marker latency ({Path(filename).name}):")
+    for name, sink in report["sinks"].items():
+        print(f"   {name:<14} n={sink['count']:<6} p50 {sink['p50_us']:>9.1f} µs  p95 {sink['p95_us']:>9.1f} µs  "
+              f"p99 {sink['p99_us']:>9.1f} µs  max {sink['max_us']:>9.1f} µs")
+    for name, counts in (counters or {}).items():
+        lost = {key: counts[key] for key in ("dropped", "late", "failed") if counts.get(key)}
+        if lost:
+            print(f"   ⚠️  {name}: " + ", ".join(f"{count} {key}" for key, count in lost.items()))
+    return report
@@ -0,0 +1,139 @@
+# experiments/neo.py
+
+"""
+NEO Event Dispatcher for XTIM Experiments
+Delivers events to a Pupil Labs NEO from an asyncio loop running in a helper
+thread, so HTTP round-trips to the phone never stretch a trial.
+"""
+
+import asyncio
+import threading
+import time
+from pupil_labs.realtime_api import Device
+from pupil_labs.realtime_api.time_echo import TimeOffsetEstimator
+from experiments.latency import LatencyHistogram
+
+
+class NeoDispatcher:
+    """
+    Queue NEO events from the presentation loop and send them asynchronously.
+    Events carry explicit device-clock timestamps computed from a measured time
+    offset; failed sends are retried with backoff and every delivery latency is
+    recorded in a histogram (from enqueue to acknowledgement, in nanoseconds).
+    """
+
+    def __init__(self, address, port=8080, retries=3, timeout=2.0):
+        self.address = address
+        self.port = port
+        self.retries = retries
+        self.timeout = timeout
+        self.offset_ms = 0.0
+        self.estimate = None
+        self.latency = LatencyHistogram()
+        self.failed = []
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        try:
+            self._call(self._connect())
+        except Exception:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            raise
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _connect(self):
+        self._queue = asyncio.Queue()
+        self.device = Device(self.address, self.port)
+        status = await self.device.get_status()
+        self._estimator = TimeOffsetEstimator(status.phone.ip, status.phone.time_echo_port)
+        try:
+            await self._estimate()
+        except Exception:
+            await self.device.close()
+            raise
+        self._worker = asyncio.ensure_future(self._drain())
+
+    async def _estimate(self):
+        estimate = await self._estimator.estimate()
+        if estimate is None:
+            # No echo came back: keep the last offset, but there must be one
+            if self.estimate is None:
+                raise ConnectionError(f"NEO at {self.address}:{self.port} answered no time echo; "
+                                      "cannot estimate its clock offset")
+            print(f"[NEO] Time echo failed, keeping offset {self.offset_ms:.1f} ms")
+            return self.estimate
+        self.estimate = estimate
+        self.offset_ms = estimate.time_offset_ms.mean
+        return estimate
+
+    def estimate_time_offset(self):
+        """
+        Re-measure the device clock offset (blocking). Same result type as the
+        simple API, so it can be used with `clocksync.neo_probe`. When no echo
+        succeeds, the previous estimate is returned.
+        """
+        return self._call(self._estimate())
+
+    def device_time(self, t_unix=None):
+        """
+        Convert a local Unix time, or now, into the NEO clock (seconds).
+        """
+        # time_offset_ms is the local clock minus the Companion clock
+        return (time.time() if t_unix is None else t_unix) - self.offset_ms / 1000.0
+
+    def send(self, label, t_device=None):
+        """
+        Queue an event stamped with `t_device` (NEO clock, seconds), or now. Never blocks.
+        """
+        t_device = self.device_time() if t_device is None else t_device
+        item = (label, int(t_device * 1e9), time.perf_counter_ns())
+        self.loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    async def _drain(self):
+        while True:
+            label, timestamp_ns, queued_ns = await self._queue.get()
+            for attempt in range(self.retries + 1):
+                try:
+                    await asyncio.wait_for(
+                        self.device.send_event(label, event_timestamp_unix_ns=timestamp_ns),
+                        self.timeout
+                    )
+                    self.latency.record(time.perf_counter_ns() - queued_ns)
+                    break
+                except Exception as e:
+                    if attempt == self.retries:
+                        self.failed.append(label)
+                        print(f"[NEO] Event '{label}' dropped after {attempt + 1} attempts: {e}")
+                    else:
+                        await asyncio.sleep(0.05 * 2 ** attempt)
+            self._queue.task_done()
+
+    def recording_start(self):
+        return self._call(self.device.recording_start())
+
+    def recording_stop_and_save(self):
+        return self._call(self.device.recording_stop_and_save())
+
+    def flush(self):
+        """
+        Block until every queued event has been delivered or dropped.
+        """
+        self._call(self._queue.join())
+
+    def close(self):
+        """
+        Wait for queued events, close the device and stop the helper thread.
+        """
+        self.flush()
+        self._worker.cancel()
+        self._call(self.device.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        if self.latency.count:
+            print(f"📡 NEO: {self.latency.count} events delivered, median latency "
+                  f"{self.latency.percentile(50) / 1e6:.1f} ms, max {self.latency.max / 1e6:.1f} ms, "
+                  f"{len(self.failed)} dropped")
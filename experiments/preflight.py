@@ -0,0 +1,305 @@
+# experiments/preflight.py
+
+"""
+Preflight Checks for XTIM Experiments
+Runs every readiness check of a protocol at once, each in a daemon thread
+with its own timeout, under one overall deadline: experiment folder, Python
+modules, device reachability (Pupil Remote or NEO, TTL port), LSL stream
+visibility, prepared stimulus cache, disk space for screenshots, display
+refresh rate and the resident broker/runner. A check that hangs is reported
+as failed when its time is up; it never delays the report. Checks only look:
+they never create files such as the runner key.
+"""
+
+import importlib.util
+import json
+import shutil
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, TimeoutError
+from pathlib import Path
+import yaml
+from experiments.protocols import DEFAULT_CONFIG, PROTOCOLS
+
+DEFAULT_DEADLINE = 2.0
+REFRESH_RANGE_HZ = (23.0, 500.0)
+
+OK, WARN, FAIL = "ok", "warn", "fail"
+
+Check = namedtuple("Check", "name function timeout")
+Result = namedtuple("Result", "name status detail seconds")
+
+
+# ─────────────────────────────────────────────
+# CHECKS
+# ─────────────────────────────────────────────
+# Each check returns (status, detail) and must not print: the report may be JSON.
+
+def check_folder(target, spec, script=None):
+    target = Path(target)
+    if script is not None and not Path(script).exists():
+        return FAIL, f"script missing: {script}"
+    if not target.is_dir():
+        return FAIL, f"experiment folder missing: {target}"
+    if spec["mode"] == "asset":
+        assets = target / "assets.txt"
+        if not assets.exists():
+            return FAIL, f"assets.txt missing in {target}"
+        with open(assets, "r", encoding="utf-8") as f:
+            count = sum(1 for line in f if line.strip())
+        return (OK if count else FAIL), f"{count} asset(s) in assets.txt"
+    stimuli = screen_stimuli(target, spec)
+    source = stimulus_source(target).relative_to(target).as_posix()
+    if not stimuli:
+        return FAIL, f"no {spec['pattern']} stimuli in {source}"
+    return OK, f"{len(stimuli)} stimuli in {source}"
+
+def check_modules(device):
+    required = ["psychopy", "pylsl", "numpy", "yaml"]
+    if device == "core":
+        required += ["zmq", "msgpack"]
+    elif device == "neo":
+        required += ["requests", "pupil_labs.realtime_api"]
+    missing = []
+    for name in required:
+        try:
+            if importlib.util.find_spec(name) is None:
+                missing.append(name)
+        except ImportError:
+            missing.append(name)
+    if missing:
+        return FAIL, f"missing: {', '.join(missing)}"
+    return OK, f"{len(required)} module(s) importable"
+
+def check_pupil(ip, port, timeout):
+    import zmq
+
+    context = zmq.Context.instance()
+    socket = context.socket(zmq.REQ)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.setsockopt(zmq.RCVTIMEO, int(timeout * 1000))
+    try:
+        socket.connect(f"tcp://{ip}:{port}")
+        start = time.perf_counter()
+        socket.send_string("t")
+        reply = socket.recv_string()
+        rtt_ms = (time.perf_counter() - start) * 1000
+    except zmq.Again:
+        return FAIL, f"Pupil Remote at {ip}:{port} did not answer"
+    finally:
+        socket.close()
+    return OK, f"Pupil Capture at {ip}:{port}, clock {float(reply):.3f} s, rtt {rtt_ms:.1f} ms"
+
+def check_neo(neo_address, timeout):
+    from experiments import devicecache
+
+    start = time.perf_counter()
+    if neo_address:
+        host, _, port = neo_address.partition(":")
+        candidates = [(host, int(port or 8080), "given")]
+    else:
+        cached = devicecache.load().get("neo")
+        candidates = [(cached["address"], cached["port"], "cached")] if cached else []
+
+    for address, port, origin in candidates:
+        serial = devicecache.probe_neo(address, port, timeout=timeout / 2)
+        if serial is not None:
+            return OK, f"NEO {serial or '?'} at {address}:{port} ({origin})"
+    if neo_address:
+        return FAIL, f"NEO at {neo_address} did not answer"
+
+    # No (reachable) cached address: spend what is left of the timeout on discovery
+    from pupil_labs.realtime_api.simple import discover_one_device
+
+    remaining = max(0.2, timeout - (time.perf_counter() - start) - 0.1)
+    found = discover_one_device(max_search_duration_seconds=remaining)
+    if found is None:
+        return FAIL, f"no NEO discovered within {remaining:.1f} s"
+    address, port = found.address, found.port
+    found.close()
+    return WARN, f"NEO discovered at {address}:{port} (not cached yet, first connect is slower)"
+
+def check_lsl(stream, wait):
+    import pylsl
+
+    streams = pylsl.resolve_streams(wait_time=wait)
+    name, _, source_id = stream
+    if any(info.name() == name and info.source_id() == source_id for info in streams):
+        return WARN, f"'{name}' ({source_id}) is already published: another session running?"
+    if not streams:
+        return WARN, "no LSL streams visible (recorder or other devices not started?)"
+    names = sorted({info.name() for info in streams})
+    return OK, f"{len(streams)} stream(s) visible: {', '.join(names)}"
+
+def check_stimulus_cache(target, spec):
+    from experiments import stimprep
+
+    target = Path(target)
+    manifest_path = target / stimprep.CACHE_DIR / stimprep.MANIFEST_NAME
+    if not manifest_path.exists():
+        return WARN, "no prepared stimuli; run 'xtim assets prepare'"
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    profile = stimprep.load_display_profile(target, fallback=manifest.get("profile"))
+    if manifest.get("profile_key") != stimprep.profile_key(profile):
+        return WARN, "prepared for another display profile; run 'xtim assets prepare'"
+
+    cache_dir = target / stimprep.CACHE_DIR
+    prepared = {rel for rel, name in manifest["entries"].items() if (cache_dir / name).exists()}
+    stimuli = {path.relative_to(target).as_posix() for path in screen_stimuli(target, spec)}
+    covered = len(stimuli & prepared)
+    if covered < len(stimuli):
+        return WARN, f"{covered}/{len(stimuli)} stimuli prepared; run 'xtim assets prepare'"
+    return OK, f"all {covered} stimuli prepared"
+
+def check_disk(target, spec):
+    target = Path(target)
+    free = shutil.disk_usage(target).free
+    if spec["mode"] != "screen":
+        return OK, f"{free / 1e9:.1f} GB free"
+    width, height = _display_conf(target).get("monitor", {}).get("resolution", [1920, 1080])
+    screenshots = len(screen_stimuli(target, spec)) * DEFAULT_CONFIG["n_repeats"]
+    # Upper bound: one uncompressed RGB frame per trial
+    needed = screenshots * int(width) * int(height) * 3
+    if free < needed:
+        return FAIL, f"{free / 1e9:.1f} GB free, {screenshots} screenshots need up to {needed / 1e9:.1f} GB"
+    return OK, f"{free / 1e9:.1f} GB free, {screenshots} screenshots need up to {needed / 1e9:.2f} GB"
+
+def check_refresh(target, config=None):
+    conf = _display_conf(target)
+    if not conf:
+        return FAIL, "config/display-conf.yml missing or empty"
+    # The same screen engine.open_window uses: the session config's screen_index
+    screen_index = int({**DEFAULT_CONFIG, **(config or {})}["screen_index"])
+    measured = _screen_refresh(screen_index)
+    override = float(conf.get("display", {}).get("flip_interval_override") or 0.0)
+    rate = 1.0 / override if override > 0 else float(conf.get("monitor", {}).get("refresh_rate_hz") or 0.0)
+    if not rate:
+        # The engine measures the refresh rate on the window in that case
+        screen = f", screen {screen_index} at {measured:.0f} Hz" if measured is not None else ""
+        return WARN, f"refresh rate not configured, will be measured at startup{screen}"
+    low, high = REFRESH_RANGE_HZ
+    if not low <= rate <= high:
+        return FAIL, f"configured refresh {rate:.1f} Hz outside {low:.0f}-{high:.0f} Hz"
+
+    if measured is None:
+        return OK, f"configured {rate:.1f} Hz (display mode not queried)"
+    if abs(measured - rate) > 1.0:
+        return WARN, f"configured {rate:.1f} Hz but screen {screen_index} runs at {measured:.0f} Hz"
+    return OK, f"configured {rate:.1f} Hz, screen {screen_index} at {measured:.0f} Hz"
+
+def check_ttl(port):
+    import serial
+
+    try:
+        serial.Serial(port, timeout=0).close()
+    except serial.SerialException as e:
+        return FAIL, f"cannot open {port}: {e}"
+    return OK, f"trigger port {port} opens"
+
+def check_services():
+    from experiments import broker, runner
+
+    up = []
+    if broker.available(timeout=0.3):
+        up.append("broker")
+    if runner.is_running():
+        up.append("runner")
+    return OK, f"{' and '.join(up)} up" if up else "no broker or runner (devices connect per session)"
+
+
+def screen_stimuli(target, spec):
+    return sorted(stimulus_source(target).glob(spec["pattern"]))
+
+def stimulus_source(target):
+    objects = Path(target) / "OBJECTS"
+    return objects / "pseudorandom" if DEFAULT_CONFIG["shuffle"] else objects
+
+def _display_conf(target):
+    path = Path(target) / "config" / "display-conf.yml"
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+def _screen_refresh(screen_index):
+    """
+    Current refresh rate of the screen as reported by the OS (via pyglet),
+    or None where the platform does not expose it.
+    """
+    try:
+        import pyglet
+
+        screens = pyglet.canvas.get_display().get_screens()
+        mode = screens[min(screen_index, len(screens) - 1)].get_mode()
+        return float(mode.rate) if mode is not None and getattr(mode, "rate", 0) else None
+    except Exception:
+        return None
+
+
+# ─────────────────────────────────────────────
+# RUNNER
+# ─────────────────────────────────────────────
+
+def preflight_checks(name, target, device=None, neo_address=None, script=None, pupil=("127.0.0.1", 50020)):
+    """
+    The checks for protocol `name` on experiment folder `target`.
+    """
+    spec = PROTOCOLS[name]
+    device = device or spec["device"]
+    checks = [
+        Check("experiment", lambda: check_folder(target, spec, script), 0.5),
+        Check("modules", lambda: check_modules(device), 0.5),
+        Check("display refresh", lambda: check_refresh(target), 1.0),
+        Check("disk space", lambda: check_disk(target, spec), 0.5),
+        Check("lsl streams", lambda: check_lsl(spec["stream"], 1.0), 1.5),
+        Check("broker / runner", check_services, 1.0)
+    ]
+    sync = _display_conf(target).get("sync") or {}
+    if sync.get("method") == "ttl":
+        checks.append(Check("ttl port", lambda: check_ttl(str(sync.get("ttl_port"))), 1.0))
+    if spec["mode"] == "screen":
+        checks.append(Check("stimulus cache", lambda: check_stimulus_cache(target, spec), 1.5))
+    if device == "core":
+        checks.append(Check("pupil capture", lambda: check_pupil(*pupil, timeout=1.0), 1.5))
+    elif device == "neo":
+        checks.append(Check("neo", lambda: check_neo(neo_address, timeout=1.6), 1.8))
+    return checks
+
+def run_checks(checks, deadline=DEFAULT_DEADLINE):
+    """
+    Start every check at once and collect the results in order. A check gets
+    min(its timeout, deadline) seconds from the common start.
+    """
+    start = time.perf_counter()
+    running = [(check, _background(check)) for check in checks]
+
+    results = []
+    for check, future in running:
+        limit = min(check.timeout, deadline)
+        try:
+            status, detail, seconds = future.result(timeout=max(0.0, start + limit - time.perf_counter()))
+        except TimeoutError:
+            status, detail, seconds = FAIL, f"no result within {limit:.1f} s", limit
+        except (Exception, SystemExit) as e:
+            status, detail, seconds = FAIL, f"{type(e).__name__}: {e}", time.perf_counter() - start
+        results.append(Result(check.name, status, detail, seconds))
+    return results
+
+def _background(check):
+    future = Future()
+
+    def work():
+        start = time.perf_counter()
+        try:
+            status, detail = check.function()
+            future.set_result((status, detail, time.perf_counter() - start))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=work, name=f"preflight-{check.name}", daemon=True).start()
+    return future
+
+def ready(results):
+    return all(result.status != FAIL for result in results)
@@ -0,0 +1,42 @@
+# experiments/protocols.py
+
+"""
+XTIM Protocol Specs
+Default session configuration and the specs of the official protocols. Kept
+free of PsychoPy/pylsl imports so the CLI and the preflight can read them
+without paying for the engine's startup.
+"""
+
+DEFAULT_CONFIG = {
+    "n_repeats": 2,
+    "shuffle": True,
+    "text_size": 40,
+    "drift_color": "black",
+    "screen_index": 1,
+    "stim_time": 1.0,
+    "blank_time": 0.4,
+    "drift_time": 1.0,
+    "welcome_duration": 3.0,
+    "goodbye_duration": 3.0,
+    "cache_budget_mb": 2048,
+    "stimulus_duration": 10.0
+}
+
+PROTOCOLS = {
+    "core-screen": {
+        "mode": "screen", "device": "core", "pattern": "*.png", "record": False,
+        "stream": ("XTIMMarkers", "Markers", "xtim_core")
+    },
+    "neo-screen": {
+        "mode": "screen", "device": "neo", "pattern": "*.tif", "record": True,
+        "stream": ("XTIMMarkers", "Markers", "xtim_neo")
+    },
+    "core-asset": {
+        "mode": "asset", "device": "core", "record": True, "confirm_end": True,
+        "stream": ("DataSyncMarker", "Tags", "xtim_core_asset"), "end_marker": "end_of_experiment"
+    },
+    "neo-asset": {
+        "mode": "asset", "device": "neo", "record": True, "confirm_end": False,
+        "stream": ("XTIMMarkers", "Markers", "xtim_neo_asset")
+    }
+}
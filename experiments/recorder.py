@@ -0,0 +1,263 @@
+# experiments/recorder.py
+
+"""
+LSL Stream Recorder for XTIM
+Records selected LSL streams (EEG, EmotiBit, XTIM markers, ...) into one XDF
+file, as LabRecorder does, without a separate application. Each stream has
+its own thread pulling chunks into buffers allocated once; every chunk is
+encoded with NumPy and appended to the file under a lock, so memory stays
+bounded by those buffers (a slow disk only backs up into liblsl's inlet
+buffer). Clock offsets are measured per stream every few seconds and
+written as XDF ClockOffset chunks; a StreamFooter closes each stream.
+"""
+
+import struct
+import threading
+import time
+import numpy as np
+import pylsl
+
+# XDF 1.0 chunk tags
+FILE_HEADER, STREAM_HEADER, SAMPLES, CLOCK_OFFSET, BOUNDARY, STREAM_FOOTER = 1, 2, 3, 4, 5, 6
+BOUNDARY_UUID = bytes([0x43, 0xA5, 0x46, 0xDC, 0xCB, 0xF5, 0x41, 0x0F,
+                       0xB3, 0x0E, 0xD5, 0x46, 0x73, 0x83, 0xCB, 0xE4])
+
+DTYPES = {
+    pylsl.cf_float32: "<f4",
+    pylsl.cf_double64: "<f8",
+    pylsl.cf_int32: "<i4",
+    pylsl.cf_int16: "<i2",
+    pylsl.cf_int8: "i1",
+    pylsl.cf_int64: "<i8"
+}
+
+
+# ─────────────────────────────────────────────
+# XDF WRITER
+# ─────────────────────────────────────────────
+
+def _varlen(n):
+    if n < 1 << 8:
+        return struct.pack("<BB", 1, n)
+    if n < 1 << 32:
+        return struct.pack("<BI", 4, n)
+    return struct.pack("<BQ", 8, n)
+
+class XDFWriter:
+    """
+    Thread-safe XDF 1.0 file writer. Each chunk is written in one locked
+    section, so streams recorded from different threads interleave cleanly.
+    """
+
+    def __init__(self, filename, boundary_interval=10.0):
+        self.filename = filename
+        self.file = open(filename, "wb", buffering=1 << 20)
+        self.lock = threading.Lock()
+        self.boundary_interval = boundary_interval
+        self._next_boundary = time.monotonic() + boundary_interval
+        self.file.write(b"XDF:")
+        self._chunk(FILE_HEADER, b'<?xml version="1.0"?><info><version>1.0</version></info>')
+
+    def _chunk(self, tag, *parts):
+        length = 2 + sum(len(part) for part in parts)
+        with self.lock:
+            self.file.write(_varlen(length))
+            self.file.write(struct.pack("<H", tag))
+            for part in parts:
+                self.file.write(part)
+            if time.monotonic() >= self._next_boundary:
+                # Boundary chunks let readers resynchronise after a damaged region
+                self.file.write(_varlen(2 + len(BOUNDARY_UUID)) + struct.pack("<H", BOUNDARY) + BOUNDARY_UUID)
+                self._next_boundary = time.monotonic() + self.boundary_interval
+
+    def stream_header(self, stream_id, xml):
+        self._chunk(STREAM_HEADER, struct.pack("<I", stream_id), xml.encode("utf-8"))
+
+    def numeric_samples(self, stream_id, records):
+        """
+        Write a structured array with fields ("tsb", "ts", "values") as one
+        Samples chunk; `tsb` must be 8 (timestamp present).
+        """
+        self._chunk(SAMPLES, struct.pack("<I", stream_id), _varlen(len(records)), records.view(np.uint8))
+
+    def string_samples(self, stream_id, timestamps, samples):
+        parts = []
+        for t, sample in zip(timestamps, samples):
+            parts.append(struct.pack("<Bd", 8, t))
+            for value in sample:
+                data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+                parts.append(_varlen(len(data)))
+                parts.append(data)
+        self._chunk(SAMPLES, struct.pack("<I", stream_id), _varlen(len(timestamps)), b"".join(parts))
+
+    def clock_offset(self, stream_id, collection_time, offset):
+        self._chunk(CLOCK_OFFSET, struct.pack("<Idd", stream_id, collection_time, offset))
+
+    def stream_footer(self, stream_id, xml):
+        self._chunk(STREAM_FOOTER, struct.pack("<I", stream_id), xml.encode("utf-8"))
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+# ─────────────────────────────────────────────
+# STREAM RECORDING
+# ─────────────────────────────────────────────
+
+class StreamRecorder:
+    """
+    Pull one LSL stream on its own thread into preallocated buffers sized for
+    `chunk_seconds` of data, and append every chunk to `writer`.
+    """
+
+    def __init__(self, stream_id, info, writer, chunk_seconds=0.2, offset_interval=5.0):
+        self.stream_id = stream_id
+        self.info = info
+        self.name = info.name()
+        self.writer = writer
+        self.chunk_seconds = chunk_seconds
+        self.offset_interval = offset_interval
+        self.channels = info.channel_count()
+        self.dtype = DTYPES.get(info.channel_format())
+        srate = info.nominal_srate()
+        self.capacity = max(64, int(srate * chunk_seconds * 4)) if srate > 0 else 256
+        self.samples = 0
+        self.chunks = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.offsets = []
+        self.error = None
+        self.header_written = False
+        self._inlet = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._record, name=f"record-{self.name}", daemon=True)
+
+    def start(self):
+        """
+        Open the inlet and write the stream header now, so every stream in the
+        file is declared before any data; then start pulling. A stream that
+        cannot be opened keeps its `error` and is left out of the file.
+        """
+        try:
+            self._inlet = pylsl.StreamInlet(self.info, max_buflen=360, recover=True)
+            self.writer.stream_header(self.stream_id, self._inlet.info(timeout=5.0).as_xml())
+            self.header_written = True
+            # Samples are buffered by liblsl from here on, even before the first pull
+            self._inlet.open_stream(timeout=5.0)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            return
+        self._thread.start()
+
+    def _record(self):
+        inlet = self._inlet
+        try:
+            self._measure_offset(inlet)
+            if self.dtype is not None:
+                self._pull_numeric(inlet)
+            else:
+                self._pull_strings(inlet)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    def _pull_numeric(self, inlet):
+        values = np.zeros((self.capacity, self.channels), dtype=self.dtype)
+        records = np.zeros(self.capacity, dtype=[("tsb", "u1"), ("ts", "<f8"),
+                                                 ("values", self.dtype, (self.channels,))])
+        records["tsb"] = 8
+        next_offset = time.monotonic() + self.offset_interval
+        while not self._stop.is_set():
+            _, timestamps = inlet.pull_chunk(timeout=self.chunk_seconds, max_samples=self.capacity,
+                                             dest_obj=values)
+            n = len(timestamps)
+            if n:
+                chunk = records[:n]
+                chunk["ts"] = timestamps
+                chunk["values"] = values[:n]
+                self.writer.numeric_samples(self.stream_id, chunk)
+                self._count(timestamps, n)
+            if time.monotonic() >= next_offset:
+                self._measure_offset(inlet)
+                next_offset = time.monotonic() + self.offset_interval
+
+    def _pull_strings(self, inlet):
+        next_offset = time.monotonic() + self.offset_interval
+        while not self._stop.is_set():
+            samples, timestamps = inlet.pull_chunk(timeout=self.chunk_seconds, max_samples=self.capacity)
+            if timestamps:
+                self.writer.string_samples(self.stream_id, timestamps, samples)
+                self._count(timestamps, len(timestamps))
+            if time.monotonic() >= next_offset:
+                self._measure_offset(inlet)
+                next_offset = time.monotonic() + self.offset_interval
+
+    def _count(self, timestamps, n):
+        if self.first_timestamp is None:
+            self.first_timestamp = float(timestamps[0])
+        self.last_timestamp = float(timestamps[n - 1])
+        self.samples += n
+        self.chunks += 1
+
+    def _measure_offset(self, inlet):
+        now = pylsl.local_clock()
+        offset = inlet.time_correction(timeout=2.0)
+        self.writer.clock_offset(self.stream_id, now - offset, offset)
+        self.offsets.append((now - offset, offset))
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def footer(self):
+        offsets = "".join(f"<offset><time>{t!r}</time><value>{value!r}</value></offset>"
+                          for t, value in self.offsets)
+        return (f'<?xml version="1.0"?><info><first_timestamp>{self.first_timestamp or 0.0!r}</first_timestamp>'
+                f"<last_timestamp>{self.last_timestamp or 0.0!r}</last_timestamp>"
+                f"<sample_count>{self.samples}</sample_count>"
+                f"<clock_offsets>{offsets}</clock_offsets></info>")
+
+
+class Recording:
+    """
+    Record `infos` (pylsl.StreamInfo from resolve_streams) into `filename`.
+    """
+
+    def __init__(self, infos, filename, chunk_seconds=0.2, offset_interval=5.0):
+        self.writer = XDFWriter(filename)
+        self.streams = [StreamRecorder(i, info, self.writer, chunk_seconds, offset_interval)
+                        for i, info in enumerate(infos, 1)]
+        self.started = None
+
+    def start(self):
+        self.started = time.monotonic()
+        for stream in self.streams:
+            stream.start()
+
+    def stop(self):
+        """
+        Stop every stream, write the stream footers and close the file. Streams
+        whose header could not be written get no footer either.
+        """
+        for stream in self.streams:
+            stream.stop()
+        for stream in self.streams:
+            if stream.header_written:
+                self.writer.stream_footer(stream.stream_id, stream.footer())
+        self.writer.close()
+
+    def status(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9) if self.started else 0.0
+        return [{"name": s.name, "channels": s.channels, "samples": s.samples,
+                 "rate": s.samples / elapsed if elapsed else 0.0, "error": s.error}
+                for s in self.streams]
+
+
+def select_streams(streams, names=(), types=()):
+    """
+    Keep the streams whose name or type was asked for (all when neither is given).
+    """
+    if not names and not types:
+        return list(streams)
+    return [info for info in streams if info.name() in names or info.type() in types]
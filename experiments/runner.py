@@ -0,0 +1,261 @@
+# experiments/runner.py
+
+"""
+Resident Experiment Runner for XTIM
+Keeps one interpreter alive with PsychoPy, pylsl, ZMQ and the engine already
+imported, optionally with an open window and a connected device backend, and
+runs protocol sessions submitted over a local authenticated socket. Sessions
+run one at a time on the main thread (OpenGL requires it); status requests
+are answered while a session is running.
+"""
+
+import argparse
+import contextlib
+import os
+import queue
+import secrets
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import Client, Listener
+from experiments.devicecache import USER_DIR
+
+DEFAULT_ADDRESS = ("127.0.0.1", 50300)
+KEY_FILE = USER_DIR / "runner.key"
+
+
+def runner_key():
+    """
+    Per-user secret shared by the runner and its clients (created on first use).
+    """
+    if not KEY_FILE.exists():
+        USER_DIR.mkdir(parents=True, exist_ok=True)
+        KEY_FILE.write_bytes(secrets.token_hex(32).encode("ascii"))
+        os.chmod(KEY_FILE, 0o600)
+    return KEY_FILE.read_bytes()
+
+
+class _ConnectionWriter:
+    """
+    File-like object forwarding printed text to the submitting client.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        if text:
+            with self.lock:
+                with contextlib.suppress(OSError, EOFError):
+                    self.conn.send(("log", text))
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class Runner:
+    """
+    Accept run requests on `address` and execute them with `engine.Session`.
+    `keep_window` opens the presentation window once and reuses it; `device`
+    ("core" or "neo") keeps that backend connected between sessions.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, keep_window=False, device=None, neo_address=None):
+        self.address = address
+        self.keep_window = keep_window
+        self.device = device
+        self.neo_address = neo_address
+        self.win = None
+        self.backend = None
+        self.started = time.time()
+        self.sessions = 0
+        self.current = None
+        self._jobs = queue.Queue()
+        self._listener = Listener(address, authkey=runner_key())
+
+    def warm(self):
+        """
+        Import the heavy modules and open the persistent window/devices.
+        """
+        start = time.perf_counter()
+        from psychopy import core, event, visual  # noqa: F401
+        from experiments import engine
+        with contextlib.suppress(ImportError):
+            import pupil_labs.realtime_api  # noqa: F401
+
+        if self.keep_window:
+            print("🖥️  Opening persistent PsychoPy window...")
+            self.win = engine.open_window()
+            self.win.flip()
+        if self.device:
+            self.backend = self._make_backend(self.device, self.neo_address)
+        print(f"🔥 Runner warm in {time.perf_counter() - start:.2f} s")
+
+    @staticmethod
+    def _make_backend(device, neo_address=None):
+        from experiments import engine
+
+        if device == "neo" and neo_address:
+            host, _, port = neo_address.partition(":")
+            return engine.NeoBackend(host, int(port or 8080))
+        return engine.BACKENDS[device]()
+
+    # Requests ─────────────────────────────────
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            except Exception as e:
+                print(f"[RUNNER] Rejected connection: {e}", file=sys.__stdout__)
+                continue
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                conn.close()
+                continue
+
+            cmd = request.get("cmd")
+            if cmd == "run":
+                if self.current is not None or not self._jobs.empty():
+                    conn.send(("log", f"⏳ Queued behind {self._jobs.qsize() + 1} session(s)\n"))
+                self._jobs.put((request, conn))
+            elif cmd == "status":
+                conn.send(("done", self.status()))
+                conn.close()
+            elif cmd == "stop":
+                conn.send(("done", {"ok": True}))
+                conn.close()
+                self._jobs.put(None)
+                return
+            else:
+                conn.send(("done", {"ok": False, "error": f"Unknown command: {cmd}"}))
+                conn.close()
+
+    def status(self):
+        return {
+            "ok": True,
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started,
+            "sessions": self.sessions,
+            "running": self.current,
+            "queued": self._jobs.qsize(),
+            "window": self.win is not None,
+            "device": self.device
+        }
+
+    def _run(self, request, conn):
+        """
+        Run one session, streaming its output to the submitting client.
+        `redirect_stdout` swaps `sys.stdout` for the whole process, so the
+        device and recorder threads of the session are forwarded too. This is
+        only correct because jobs run strictly one at a time from `serve`;
+        never call it from another thread.
+        """
+        from experiments import engine
+
+        start = time.perf_counter()
+        result = {"ok": True}
+        self.current = f"{request['name']} @ {request['target']}"
+        try:
+            with contextlib.redirect_stdout(_ConnectionWriter(conn)):
+                protocol = engine.Protocol(request["name"], request["target"], device=request.get("device"),
+                                           resume=request.get("resume", False))
+                keep = self.backend is not None and protocol.device == self.device
+                if keep:
+                    backend = self.backend
+                elif request.get("neo_address") and protocol.device == "neo":
+                    backend = self._make_backend("neo", request["neo_address"])
+                else:
+                    backend = None
+                win = self.win if protocol.mode == "screen" else None
+                engine.Session(protocol, backend=backend, win=win, keep_backend=keep).run()
+        except (Exception, SystemExit, KeyboardInterrupt) as e:
+            result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            traceback.print_exc()
+        finally:
+            self.current = None
+            self.sessions += 1
+            if self.win is not None:
+                self.win.flip()
+        result["seconds"] = time.perf_counter() - start
+        with contextlib.suppress(OSError, EOFError):
+            conn.send(("done", result))
+        conn.close()
+        print(f"{'✅' if result['ok'] else '❌'} {request['name']} finished in {result['seconds']:.1f} s")
+
+    def serve(self):
+        """
+        Run submitted sessions until a "stop" request arrives.
+        """
+        self.warm()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"📡 XTIM runner listening on {self.address[0]}:{self.address[1]} (pid {os.getpid()})")
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                self._run(*job)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        self._listener.close()
+        if self.backend is not None:
+            self.backend.close()
+        if self.win is not None:
+            self.win.close()
+        print("🛑 Runner stopped.")
+
+
+# ─────────────────────────────────────────────
+# CLIENT
+# ─────────────────────────────────────────────
+
+def request(message, address=DEFAULT_ADDRESS, on_log=None):
+    """
+    Send one request to a running runner and return its final reply.
+    Session output is passed to `on_log` as it arrives.
+    """
+    with Client(address, authkey=runner_key()) as conn:
+        conn.send(message)
+        while True:
+            kind, payload = conn.recv()
+            if kind == "done":
+                return payload
+            if on_log is not None:
+                on_log(payload)
+
+def is_running(address=DEFAULT_ADDRESS):
+    """
+    True if a runner answers on `address`. Never creates the key: a runner
+    creates it when it starts, so without one there is nothing to ask.
+    """
+    if not KEY_FILE.exists():
+        return False
+    try:
+        return request({"cmd": "status"}, address)["ok"]
+    except (ConnectionRefusedError, OSError, EOFError):
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident XTIM experiment runner.")
+    parser.add_argument("--port", type=int, default=DEFAULT_ADDRESS[1], help="Local port to listen on")
+    parser.add_argument("--window", action="store_true", help="Keep a presentation window open between sessions")
+    parser.add_argument("--device", choices=["core", "neo"], default=None,
+                        help="Keep this device backend connected between sessions")
+    parser.add_argument("--neo-address", default=None, help="NEO host[:port] instead of discovery")
+    args = parser.parse_args()
+    Runner((DEFAULT_ADDRESS[0], args.port), keep_window=args.window, device=args.device,
+           neo_address=args.neo_address).serve()
+
+if __name__ == "__main__":
+    main()
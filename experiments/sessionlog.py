@@ -0,0 +1,91 @@
+# experiments/sessionlog.py
+
+"""
+Session Event Log for XTIM Experiments
+Append-only, fixed-schema binary log of every session event. Records are
+buffered in memory and flushed to disk from a background thread, so a crash
+loses at most the last flush interval. The file loads straight into NumPy
+(or pandas) without per-line parsing.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from pathlib import Path
+import numpy as np
+
+# pupil_time holds the eye-tracker clock of the session: Pupil Core or NEO.
+SESSION_DTYPE = np.dtype([
+    ("trial", "<i4"),
+    ("event", "S24"),
+    ("stimulus", "S96"),
+    ("flip_time", "<f8"),
+    ("lsl_time", "<f8"),
+    ("pupil_time", "<f8"),
+    ("dropped", "<i4")
+])
+
+LOG_NAME = "session_log.bin"
+
+
+class SessionLog:
+    """
+    Streaming writer for SESSION_DTYPE records. `append` only pushes a tuple on
+    a thread-safe deque; encoding and disk writes happen on the flush thread.
+    The file is truncated unless `resume` is set, in which case records are
+    added to those of the aborted session.
+    """
+
+    def __init__(self, filename, flush_interval=0.25, resume=False):
+        self.filename = Path(filename)
+        self.flush_interval = flush_interval
+        self._file = open(self.filename, "ab" if resume else "wb")
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        with open(self.filename.with_suffix(".json"), "w", encoding="utf-8") as f:
+            json.dump({"dtype": SESSION_DTYPE.descr, "itemsize": SESSION_DTYPE.itemsize}, f, indent=2)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def append(self, trial, event, stimulus="", flip_time=np.nan, lsl_time=np.nan, pupil_time=np.nan, dropped=0):
+        self._pending.append((trial, event, stimulus, flip_time, lsl_time, pupil_time, dropped))
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered records and push them to disk.
+        """
+        with self._lock:
+            rows = [self._pending.popleft() for _ in range(len(self._pending))]
+            if not rows:
+                return
+            records = np.array([
+                (trial, event.encode("utf-8")[:24], str(stimulus).encode("utf-8")[:96],
+                 flip_time, lsl_time, pupil_time, dropped)
+                for trial, event, stimulus, flip_time, lsl_time, pupil_time, dropped in rows
+            ], dtype=SESSION_DTYPE)
+            self._file.write(records.tobytes())
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+
+def load_session_log(filename):
+    """
+    Load a session log as a NumPy structured array (pandas: `pd.DataFrame(log)`).
+    A partially written last record, e.g. after a crash, is ignored.
+    """
+    data = Path(filename).read_bytes()
+    usable = len(data) - len(data) % SESSION_DTYPE.itemsize
+    return np.frombuffer(data[:usable], dtype=SESSION_DTYPE)
@@ -0,0 +1,149 @@
+# experiments/stimprep.py
+
+"""
+Stimulus Preparation for XTIM Experiments
+Converts each stimulus once to fit the display resolution as a raw RGBA array and
+stores it in a content-addressed cache (source hash + display profile), so the
+protocols load stimuli without decoding or resampling at session time.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import yaml
+from PIL import Image
+
+CACHE_DIR = Path("__cache__") / "stimuli"
+MANIFEST_NAME = "manifest.json"
+VALID_EXTENSIONS = (".tif", ".tiff", ".png", ".jpg", ".jpeg")
+
+
+# ─────────────────────────────────────────────
+# DISPLAY PROFILE
+# ─────────────────────────────────────────────
+
+def load_display_profile(experiment_dir, fallback=None):
+    """
+    Read the resolution and color settings that determine the prepared arrays.
+    Returns `fallback` (e.g. the profile stored in a manifest) when the
+    experiment has no display-conf.yml and a fallback is given.
+    """
+    config_path = Path(experiment_dir) / "config" / "display-conf.yml"
+    if fallback is not None and not config_path.exists():
+        return fallback
+    with open(config_path, "r", encoding="utf-8") as f:
+        conf = yaml.safe_load(f) or {}
+    return {
+        "resolution": [int(v) for v in conf.get("monitor", {}).get("resolution", [1920, 1080])],
+        "color_space": conf.get("display", {}).get("color_space", "rgb255"),
+        "format": "RGBA8",
+        "layout": "fit"
+    }
+
+def profile_key(profile):
+    return hashlib.blake2b(json.dumps(profile, sort_keys=True).encode(), digest_size=6).hexdigest()
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ─────────────────────────────────────────────
+# CONVERSION
+# ─────────────────────────────────────────────
+
+def convert(source, resolution):
+    """
+    Fit `source` inside `resolution` (never upscaling). Returns an HxWx4 uint8
+    array of the fitted image only: the window centers it, so padding it to
+    the screen size would just spend cache budget on transparent pixels.
+    """
+    width, height = resolution
+    image = Image.open(source).convert("RGBA")
+    if image.width > width or image.height > height:
+        image.thumbnail((width, height), Image.LANCZOS)
+    return np.asarray(image)
+
+def _prepare_one(job):
+    source, cache_dir, key, resolution = job
+    target = Path(cache_dir) / f"{file_hash(source)}-{key}.npy"
+    if target.exists():
+        return source, target.name, False
+
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, convert(source, resolution))
+    os.replace(tmp, target)
+    return source, target.name, True
+
+def find_stimuli(experiment_dir):
+    objects = Path(experiment_dir) / "OBJECTS"
+    folders = [objects, objects / "pseudorandom"]
+    return sorted(f for d in folders if d.exists() for f in d.iterdir()
+                  if f.is_file() and f.suffix.lower() in VALID_EXTENSIONS)
+
+def prepare(experiment_dir, workers=None):
+    """
+    Convert every stimulus of an experiment into the cache using all cores.
+    Returns (manifest, number of newly converted files).
+    """
+    experiment_dir = Path(experiment_dir)
+    profile = load_display_profile(experiment_dir)
+    key = profile_key(profile)
+    cache_dir = experiment_dir / CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = [(str(src), str(cache_dir), key, profile["resolution"]) for src in find_stimuli(experiment_dir)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_prepare_one, jobs, chunksize=4))
+
+    manifest = {
+        "profile": profile,
+        "profile_key": key,
+        "entries": {Path(src).relative_to(experiment_dir).as_posix(): name for src, name, _ in results}
+    }
+    with open(cache_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest, sum(1 for *_, converted in results if converted)
+
+
+# ─────────────────────────────────────────────
+# LOADING
+# ─────────────────────────────────────────────
+
+def load_manifest(experiment_dir):
+    """
+    Map absolute stimulus paths to their prepared .npy files.
+    Returns an empty dict when nothing is prepared or the display profile changed.
+    Without a display-conf.yml the geometry stored in the manifest is used.
+    """
+    experiment_dir = Path(experiment_dir)
+    cache_dir = experiment_dir / CACHE_DIR
+    manifest_path = cache_dir / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {}
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    profile = load_display_profile(experiment_dir, fallback=manifest.get("profile"))
+    if manifest.get("profile_key") != profile_key(profile):
+        print("⚠️  Prepared stimuli are for another display profile; run 'xtim assets prepare' again.")
+        return {}
+
+    prepared = {}
+    for rel, name in manifest["entries"].items():
+        if (cache_dir / name).exists():
+            prepared[str(experiment_dir / rel)] = cache_dir / name
+    return prepared
+
+def load_prepared(path):
+    """
+    Memory-map a prepared stimulus as an RGBA PIL image.
+    """
+    return Image.fromarray(np.load(path, mmap_mode="r"), "RGBA")
@@ -0,0 +1,174 @@
+# experiments/ttl.py
+
+"""
+TTL Triggers for XTIM Experiments
+Sends 8-bit trigger codes to an EEG amplifier through a serial trigger
+interface on `sync.ttl_port` (display-conf.yml, with `sync.method: ttl`).
+Marker labels are mapped to single prebuilt bytes when the protocol is
+compiled; the marker bus worker writes them and returns the line to 0 after
+the pulse width, so the render thread never touches the port.
+"""
+
+import json
+import time
+import serial
+from experiments import commons as cm
+from experiments.latency import LatencyHistogram
+
+CODES_NAME = "ttl_codes.json"
+RESET = b"\x00"
+
+# Codes 1-239 identify stimuli (or assets), in name order.
+MAX_STIMULUS_CODE = 239
+CONTROL_CODES = {
+    "blank": 240,
+    "end_of_stimulation": 241,
+    "START": 250,
+    "RESUME": 251,
+    "DRIFT": 252,
+    "END": 253
+}
+
+
+# ─────────────────────────────────────────────
+# TRIGGER CODES
+# ─────────────────────────────────────────────
+
+def ttl_config(sync):
+    """
+    Trigger settings from the `sync` section of display-conf.yml.
+    """
+    return {
+        "port": str(sync["ttl_port"]),
+        "baudrate": int(sync.get("ttl_baud") or 115200),
+        "pulse_ms": float(sync.get("ttl_pulse_ms") or 10.0),
+        "codes": dict(sync.get("ttl_codes") or {})
+    }
+
+def compile_codes(trials, mode, overrides=None, end_label="END"):
+    """
+    Map every marker of a trial table to its one-byte trigger.
+    Stimuli get the free codes from 1 to 239 in name order (stable across
+    shuffled sessions of one experiment); the blank onset (screen) or end of
+    stimulation (asset) and the session markers use CONTROL_CODES.
+    `overrides` ({stimulus name or control name: code}) take precedence, but
+    a code may not be shared by two control markers or by a control marker
+    and a stimulus. A protocol that closes with another label than "END"
+    passes it as `end_label` to send the END code for it.
+    Returns ({marker label: bytes}, {"stimuli", "control"} table).
+    """
+    overrides = overrides or {}
+    for key, code in overrides.items():
+        if not 1 <= int(code) <= 255:
+            raise ValueError(f"TTL code for '{key}' must be 1-255, got {code}")
+    control = {key: int(overrides.get(key, code)) for key, code in CONTROL_CODES.items()}
+    owners = {}
+    for key, code in control.items():
+        if code in owners:
+            raise ValueError(f"TTL code {code} is used by both '{owners[code]}' and '{key}' in sync.ttl_codes")
+        owners[code] = key
+    end_code = control["blank"] if mode == "screen" else control["end_of_stimulation"]
+
+    stimuli = {}
+    taken = {int(code) for key, code in overrides.items() if key not in control} | set(control.values())
+    next_code = 1
+    for name in sorted({trial.name for trial in trials}):
+        if name in overrides:
+            stimuli[name] = int(overrides[name])
+            if stimuli[name] in owners:
+                raise ValueError(f"TTL code {stimuli[name]} of stimulus '{name}' is the code of "
+                                 f"'{owners[stimuli[name]]}'; change one of them in sync.ttl_codes")
+            continue
+        while next_code in taken:
+            next_code += 1
+        if next_code > MAX_STIMULUS_CODE:
+            raise ValueError(f"More than {MAX_STIMULUS_CODE} stimuli for 8-bit triggers; "
+                             "map them explicitly in sync.ttl_codes")
+        stimuli[name] = next_code
+        next_code += 1
+
+    codes = {label: bytes([code]) for label, code in control.items()}
+    codes[end_label] = codes["END"]
+    for trial in trials:
+        codes[trial.marker] = bytes([stimuli[trial.name]])
+        codes[trial.end_marker] = bytes([end_code])
+    return codes, {"stimuli": stimuli, "control": control}
+
+def save_codes(table, filename):
+    """
+    Write the code table next to the session output, to decode the EEG triggers.
+    """
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(table, f, indent=1)
+
+
+# ─────────────────────────────────────────────
+# SERIAL SINK
+# ─────────────────────────────────────────────
+
+def open_port(port, baudrate=115200, write_timeout=0.5):
+    """
+    Open the trigger port once for the session and set the line to 0.
+    """
+    connection = serial.Serial(port, baudrate=baudrate, timeout=0, write_timeout=write_timeout)
+    connection.write(RESET)
+    connection.flush()
+    return connection
+
+class TTLSink(cm.MarkerSink):
+    """
+    Marker bus sink writing the precompiled byte of each marker to `connection`
+    (an open serial port). The line returns to 0 `pulse_ms` later from the
+    sink's worker; a marker arriving while a pulse is high resets it first so
+    every trigger is a new edge. `write_latency` times each code write
+    (write + flush to the driver); labels without a code are counted in
+    `unmapped`. Closing the sink also closes the port.
+    """
+    name = "ttl"
+
+    def __init__(self, connection, codes, pulse_ms=10.0, **kwargs):
+        self.connection = connection
+        self.codes = codes
+        self.pulse = pulse_ms / 1000.0
+        self.write_latency = LatencyHistogram()
+        self.unmapped = 0
+        self._reset_at = None
+        super().__init__(**kwargs)
+
+    def write(self, label, t):
+        code = self.codes.get(label)
+        if code is None:
+            self.unmapped += 1
+            return
+        if self._reset_at is not None:
+            self._send(RESET)
+        start = time.perf_counter_ns()
+        self._send(code)
+        self.write_latency.record(time.perf_counter_ns() - start)
+        self._reset_at = time.perf_counter() + self.pulse
+
+    def idle_timeout(self):
+        if self._reset_at is None:
+            return None
+        return max(0.0, self._reset_at - time.perf_counter())
+
+    def idle(self):
+        self._send(RESET)
+        self._reset_at = None
+
+    def _send(self, data):
+        self.connection.write(data)
+        self.connection.flush()
+
+    def stats(self):
+        return {**super().stats(), "unmapped": self.unmapped}
+
+    def histograms(self):
+        return {**super().histograms(), "ttl_write": self.write_latency}
+
+    def close(self):
+        super().close()
+        if self._reset_at is not None:
+            time.sleep(max(0.0, self._reset_at - time.perf_counter()))
+            self.idle()
+        self.connection.close()